@@ -0,0 +1,64 @@
+import argparse
+import glob
+import os
+import time
+import pandas as pd
+
+from mojo import fetch_page, parse_box_office, parse_box_office_bs4, MOJO_RATE_LIMIT
+from http_utils import RateLimitedSession
+from response_cache import ResponseCache
+
+# Compare the single-pass lxml extractor with the original BeautifulSoup one on saved title pages
+
+def save_fixtures(movie_ids, fixtures_dir):
+    """Download title pages once so the benchmark runs offline"""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    session = RateLimitedSession(rate=MOJO_RATE_LIMIT, per_host=True, cache=ResponseCache.from_env())
+    for movie_id in movie_ids:
+        content = fetch_page(movie_id, session)
+        if content:
+            with open(os.path.join(fixtures_dir, f"{movie_id}.html"), 'wb') as file:
+                file.write(content)
+    session.close()
+
+def load_fixtures(fixtures_dir):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+        with open(path, 'rb') as file:
+            pages[os.path.splitext(os.path.basename(path))[0]] = file.read()
+    return pages
+
+def time_parser(parser, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = {movie_id: parser(movie_id, content) for movie_id, content in pages.items()}
+    elapsed = time.perf_counter() - start
+    return results, len(pages) * repeat / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Box Office Mojo page parsers on saved HTML fixtures")
+    parser.add_argument('fixtures_dir')
+    parser.add_argument('--save', type=int, default=0, help="First download this many pages from movies.tsv")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.save:
+        movie_ids = pd.read_csv('./movies.tsv', sep='\t').iloc[:args.save, 0].tolist()
+        save_fixtures(movie_ids, args.fixtures_dir)
+
+    pages = load_fixtures(args.fixtures_dir)
+    if not pages:
+        print(f"No .html fixtures in {args.fixtures_dir}")
+        return
+
+    reference, bs4_rate = time_parser(parse_box_office_bs4, pages, args.repeat)
+    results, lxml_rate = time_parser(parse_box_office, pages, args.repeat)
+
+    mismatches = [movie_id for movie_id in pages if list(reference[movie_id].items()) != list(results[movie_id].items())]
+    print(f"Pages: {len(pages)}")
+    print(f"html.parser + BeautifulSoup: {bs4_rate:.1f} pages/s")
+    print(f"lxml single pass: {lxml_rate:.1f} pages/s ({lxml_rate / bs4_rate:.1f}x)")
+    print(f"Pages with different output: {len(mismatches)} {mismatches[:10]}")
+
+if __name__ == "__main__":
+    main()
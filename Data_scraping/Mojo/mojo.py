@@ -1,23 +1,119 @@
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
+from lxml import html
 import csv
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
-file_path = './movies.tsv'
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from checkpoint_store import CheckpointStore
+from http_utils import RateLimitedSession
+from response_cache import ResponseCache
 
-df = pd.read_csv(file_path, sep='\t')
+# Requests per second to boxofficemojo.com, shared by all worker threads
+MOJO_RATE_LIMIT = 5
 
-movie_ids = df.iloc[:, 0].tolist()
+SUMMARY_LABELS = ['Domestic Distributor', 'Domestic Opening', 'MPAA', 'Running Time', 'Budget',
+                  'Earliest Release Date', 'Genres']
 
-def scrape_box_office(movie_id):
+def fetch_page(movie_id, session):
+    """Raw HTML of a title page, or None if it does not exist"""
     url = f'https://www.boxofficemojo.com/title/{movie_id}/'
-    response = requests.get(url)
+    response = session.get(url)
 
     if response.status_code != 200:
         print(f"Failed to fetch data for {movie_id}")
         return None
+    return response.content
+
+def scrape_box_office(movie_id, session):
+    """Box office data of one title, fetched through the run's shared session"""
+    content = fetch_page(movie_id, session)
+    return parse_box_office(movie_id, content) if content else None
+
+def _has_class(element, name):
+    return name in (element.get('class') or '').split()
+
+def _text(element):
+    return element.text_content() if element is not None else None
+
+def parse_box_office(movie_id, content):
+    """Extract all fields in a single pass over the lxml tree"""
+    root = html.fromstring(content)
+
+    title_section = None
+    synopsis_section = None
+    summary_divs = []
+    performance_sections = []
+    # One walk over the document; only the small summary subtrees are revisited below
+    for element in root.iter('h1', 'span', 'div'):
+        if element.tag == 'h1':
+            if title_section is None and _has_class(element, 'a-size-extra-large'):
+                title_section = element
+        elif element.tag == 'span':
+            if synopsis_section is None and _has_class(element, 'a-size-medium'):
+                synopsis_section = element
+        elif _has_class(element, 'mojo-summary-values'):
+            summary_divs.append(element)
+        elif _has_class(element, 'mojo-performance-summary'):
+            performance_sections.extend(
+                section for section in element.iterdescendants() if _has_class(section, 'a-section')
+            )
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    data = {}
+    data["Id"] = movie_id
+    if title_section is not None:
+        title = title_section.text_content().strip()
+        parts = title.split('(')
+        data['Title'] = parts[0].strip()
+        data['Year'] = parts[1].strip(')') if len(parts) > 1 else "none"
+    data['Synopsis'] = synopsis_section.text_content().strip() if synopsis_section is not None else "none"
+
+    # All Releases (Domestic, International, Worldwide)
+    if performance_sections:
+        for release in performance_sections:
+            key = next(span for span in release.iter('span') if _has_class(span, 'a-size-small')).text_content().strip()
+            value = next((span for span in release.iter('span') if _has_class(span, 'money')), None)
+            data[key] = value.text_content().strip() if value is not None else "none"
+    else:
+        data["Domestic"] = "none"
+        data["International"] = "none"
+        data["Worldwide"] = "none"
+
+    # Label span -> value span of every summary block; the first block that has a label wins
+    summary = {}
+    for div in summary_divs:
+        for span in div.iter('span'):
+            if len(span) == 0 and span.text in SUMMARY_LABELS and span.text not in summary:
+                summary[span.text] = next(span.itersiblings('span'), None)
+
+    def summary_text(label):
+        return _text(summary.get(label))
+
+    distributor = summary_text('Domestic Distributor')
+    data['Domestic Distributor'] = distributor.replace('See full company information', '').strip() if distributor is not None else "none"
+
+    opening = summary_text('Domestic Opening')
+    data['Domestic Opening'] = opening.strip().split('\n')[0].strip() if opening is not None else "none"
+
+    if summary_divs:
+        for label in ['MPAA', 'Running Time', 'Budget']:
+            value = summary_text(label)
+            data[label] = value.strip() if value is not None else "none"
+        release_date = summary_text('Earliest Release Date')
+        data['Earliest Release Date'] = ' '.join(release_date.split()) if release_date is not None else "none"
+
+    genres = summary_text('Genres')
+    if genres is not None:
+        data['Genres'] = ','.join(genre.strip() for genre in genres.strip().split('\n') if genre.strip())
+    else:
+        data['Genres'] = "none"
+    return data
+
+def parse_box_office_bs4(movie_id, content):
+    """Original BeautifulSoup/html.parser extractor, kept as the reference for benchmark_parser.py"""
+    soup = BeautifulSoup(content, 'html.parser')
     data = {}
     data["Id"]=movie_id
     title_section = soup.find('h1', class_='a-size-extra-large')
@@ -102,28 +198,48 @@ def scrape_box_office(movie_id):
         data['Genres'] = "none"
     return data
 
-def scrape_movies(start_id="tt0035423",output_file="scraped_data.tsv"):
-
-    # Find the starting index based on the provided movie ID
-    try:
-        start_index = movie_ids.index(start_id)
-    except ValueError:
-        print(f"Start ID '{start_id}' not found in the movie_ids list.")
-        return 
-
-
-        # Iterate over movie IDs starting from start_index
-    for movie_id in movie_ids[start_index:]:
-        with open(output_file, mode='a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file, delimiter='\t')
-            try:
-                print(f"Scraping data for movie ID: {movie_id}...")
-                data = scrape_box_office(movie_id)
-                if data:
+def scrape_movies(movie_ids, output_file="scraped_data.tsv", state_db="scrape_state.sqlite", workers=8, rate=MOJO_RATE_LIMIT,
+                  cache=None, job="mojo"):
+    store = CheckpointStore(job, state_db)
+    pending = store.pending(movie_ids)
+    print(f"{len(pending)} movie IDs left to scrape ({store.summary()})")
+
+    session = RateLimitedSession(rate=rate, pool_size=workers, per_host=True, cache=cache)
+
+    def scrape(movie_id):
+        try:
+            return scrape_box_office(movie_id, session), None
+        except Exception as e:
+            return None, e
+
+    with open(output_file, mode='a', newline='', encoding='utf-8') as file, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        writer = csv.writer(file, delimiter='\t')
+        # Submit in windows so only a bounded number of pages are held in memory
+        window = workers * 16
+        for start in range(0, len(pending), window):
+            chunk = pending[start:start + window]
+            for movie_id, (data, error) in zip(chunk, executor.map(scrape, chunk)):
+                if error is not None:
+                    print(f"Error scraping movie ID {movie_id}: {error}")
+                    store.mark_failed(movie_id, error)
+                elif data:
                     writer.writerow(data.values())
-            except Exception as e:
-                print(f"Error scraping movie ID {movie_id}: {e}")
-
-
-scrape_movies()
-
+                    store.mark_done(movie_id)
+                else:
+                    store.mark_failed(movie_id, "no page")
+            file.flush()
+            store.commit()
+            print(f"Scraped {min(start + window, len(pending))}/{len(pending)}")
+    session.close()
+    store.close()
+
+
+if __name__ == "__main__":
+    df = pd.read_csv('./movies.tsv', sep='\t')
+    cache = ResponseCache.from_env()
+    if cache.offline:
+        # Replay: re-parse every cached page into a fresh output with its own checkpoint job
+        scrape_movies(df.iloc[:, 0].tolist(), output_file="scraped_data_replay.tsv", cache=cache, job="mojo_replay")
+    else:
+        scrape_movies(df.iloc[:, 0].tolist(), cache=cache)
@@ -1,10 +1,16 @@
-import time
-import requests
+import os
 from bs4 import BeautifulSoup
 import csv
 import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from http_utils import RateLimitedSession
+from response_cache import ResponseCache
 sys.stdout.reconfigure(encoding='utf-8')
 
+# One request per second to the-numbers.com; cached pages are replayed without waiting
+session = RateLimitedSession(rate=1, per_host=True, cache=ResponseCache.from_env())
+
 # get the budgets from the numbers
 
 
@@ -20,7 +26,7 @@ with open(output_file, mode='w', newline='', encoding='utf-8') as file:
 for i in range(11, 12):
     print(f"Scraping page {i}")
     url = f"https://www.the-numbers.com/movie/budgets/all/{i}01"
-    response = requests.get(url)
+    response = session.get(url)
     response.raise_for_status()  
     html_content = response.text
 
@@ -44,7 +50,6 @@ for i in range(11, 12):
             writer = csv.writer(file, delimiter='\t')
             writer.writerow(movie_data)
             print(f"Scraped: {movie_data[1]}")
-        time.sleep(1)
 
     print(f"Data has been written to {output_file}")
 
@@ -1,12 +1,19 @@
-import time
+import os
 import requests
 from bs4 import BeautifulSoup
 import csv
 import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from http_utils import RateLimitedSession
+from response_cache import ResponseCache
 import pandas as pd
 
 sys.stdout.reconfigure(encoding='utf-8')
 
+# One request per second to the-numbers.com; cached pages are replayed without waiting
+session = RateLimitedSession(rate=1, per_host=True, cache=ResponseCache.from_env())
+
 # scrape each production company with their movies
 
 output_file = "movies_prod_comp_rest.tsv"
@@ -25,7 +32,7 @@ for company in companies[0:7094]:
     print(f"Scraping {company[0]}")
     print(f"URL: {company[4]}")
     try:
-        response = requests.get(company[4])
+        response = session.get(company[4])
     except requests.exceptions.RequestException as e:
         print(f"Failed to fetch data for {company[0]}")
         with open(failed_file, mode='a', newline='', encoding='utf-8') as file:
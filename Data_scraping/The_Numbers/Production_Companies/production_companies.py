@@ -1,10 +1,16 @@
-import time
-import requests
+import os
 from bs4 import BeautifulSoup
 import csv
 import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from http_utils import RateLimitedSession
+from response_cache import ResponseCache
 sys.stdout.reconfigure(encoding='utf-8')
 
+# One request per second to the-numbers.com; cached pages are replayed without waiting
+session = RateLimitedSession(rate=1, per_host=True, cache=ResponseCache.from_env())
+
 # scrape all the production companies with their likns
 
 url = "https://www.the-numbers.com/movies/production-companies/#production_companies_overview=p1:od1"
@@ -18,7 +24,7 @@ with open(output_file, mode='w', newline='', encoding='utf-8') as file:
 for i in range(0, 174):
     print(f"Scraping page {i}")
     url = f"https://www.the-numbers.com/movies/production-companies/#production_companies_overview=p{i}:od1"
-    response = requests.get(url)
+    response = session.get(url)
     response.raise_for_status()
     html_content = response.text
 
@@ -45,6 +51,5 @@ for i in range(0, 174):
             writer = csv.writer(file, delimiter='\t')
             writer.writerow(prod_comp)
             print(f"Scraped: {prod_comp[0]}")
-        time.sleep(1)
 
     print(f"Data has been written to {output_file}")
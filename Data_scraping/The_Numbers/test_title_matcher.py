@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from title_matcher import UNDATED_FACTOR, dedupe_joined, match_titles
+
+def test_exact_and_fuzzy_matches():
+    matches = match_titles(
+        ['The Matrix', 'Heat', 'Amelie', 'Spider-Man: No Way Home'],
+        ['1999-03-31', '1995-12-15', '2001-04-25', '2021-12-17'],
+        ['Matrix', 'Heat', 'Heat', 'Amélie', 'Spider-Man No Way Home!'],
+        ['1999-03-24', '1986-01-01', '1995-12-20', None, '2021-12-16'],
+    )
+    assert matches['right'].tolist()[:2] == [0, 2]
+    assert matches['method'].tolist()[:2] == ['exact', 'exact']
+    # Only one of the two dates is known, so the identical title does not match
+    assert np.isnan(matches.loc[2, 'right'])
+    assert matches.loc[3, 'right'] == 4
+
+def test_undated_titles_match_each_other():
+    matches = match_titles(['Heat', 'Alien'], [None, None], ['Alien', 'Heat'], [None, '1995-12-15'])
+    assert np.isnan(matches.loc[0, 'right'])
+    assert matches.loc[1, 'right'] == 0
+    assert matches.loc[1, 'confidence'] == UNDATED_FACTOR
+
+def test_dedupe_joined():
+    values = pd.Series(['A, B, A', None, 'C'])
+    assert dedupe_joined(values).tolist()[::2] == ['A, B', 'C']
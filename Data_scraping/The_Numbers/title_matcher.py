@@ -0,0 +1,112 @@
+import unicodedata
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Release dates from different sources can be a few days apart (festival vs wide release, time zones)
+MAX_DATE_SKEW_DAYS = 14
+# Minimum trigram Jaccard similarity for a fuzzy title match
+MIN_TITLE_SIMILARITY = 0.75
+# Confidence factor for identical titles that both lack a date (the old title + date merge matched those)
+UNDATED_FACTOR = 0.5
+
+def normalize_titles(titles):
+    """Lowercase ASCII titles without punctuation, '&' spelled out and a leading article dropped"""
+    titles = titles.fillna('').astype(str).map(
+        lambda title: unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii'))
+    titles = titles.str.lower().str.replace('&', ' and ', regex=False)
+    titles = titles.str.replace(r"[^\w\s]|_", ' ', regex=True).str.replace(r'\s+', ' ', regex=True).str.strip()
+    return titles.str.replace(r'^(?:the|a|an) ', '', regex=True)
+
+def trigram_matrix(keys):
+    """Binary (n x vocabulary) sparse matrix of the padded character trigrams of each key"""
+    padded = ' ' + keys + ' '
+    grams = pd.Series([[key[i:i + 3] for i in range(len(key) - 2)] for key in padded], index=np.arange(len(keys)))
+    exploded = grams.explode().dropna()
+    codes, _ = pd.factorize(exploded)
+    matrix = sp.csr_matrix((np.ones(len(codes), dtype=np.int32), (exploded.index.to_numpy(), codes)),
+                           shape=(len(keys), codes.max() + 1 if len(codes) else 0))
+    # Repeated trigrams in a title count once
+    matrix.data[:] = 1
+    return matrix
+
+def _date_factor(left_dates, right_dates, max_days):
+    """Date agreement in [0.5, 1] for candidate pairs.
+
+    NaN (no match) when the dates are too far apart or only one of them is known;
+    UNDATED_FACTOR when both are missing.
+    """
+    diff = np.abs((left_dates - right_dates) / np.timedelta64(1, 'D'))
+    known = ~np.isnan(diff)
+    undated = np.isnat(left_dates) & np.isnat(right_dates)
+    factor = np.where(known, 1 - 0.5 * diff / max_days, np.where(undated, UNDATED_FACTOR, np.nan))
+    return np.where(known & (diff > max_days), np.nan, factor), diff
+
+def _best(pairs):
+    """Highest-confidence candidate per left row, closest date breaking ties"""
+    pairs = pairs.dropna(subset=['confidence'])
+    pairs = pairs.sort_values(['left', 'confidence', 'date_diff'], ascending=[True, False, True], na_position='last')
+    return pairs.drop_duplicates('left')
+
+def match_titles(left_titles, left_dates, right_titles, right_dates, max_days=MAX_DATE_SKEW_DAYS,
+                 min_similarity=MIN_TITLE_SIMILARITY):
+    """Match every left movie to at most one right movie by title and release date.
+
+    Exact normalized titles are matched first, when the dates are at most `max_days`
+    apart or both missing; a pair with only one date never matches. The remaining
+    dated left movies are compared by trigram Jaccard similarity against right movies
+    released the same year or one year apart. Returns a frame indexed by left position with the matched right
+    position, a confidence in (0, 1] and the method ('exact' or 'fuzzy').
+    """
+    left = pd.DataFrame({'key': normalize_titles(pd.Series(left_titles)).to_numpy(),
+                         'date': pd.to_datetime(pd.Series(left_dates)).to_numpy()})
+    right = pd.DataFrame({'key': normalize_titles(pd.Series(right_titles)).to_numpy(),
+                          'date': pd.to_datetime(pd.Series(right_dates)).to_numpy()})
+    left['year'] = left['date'].dt.year
+    right['year'] = right['date'].dt.year
+
+    # Exact title keys: a hash join, then date agreement picks among remakes and re-releases
+    pairs = left.reset_index(names='left').merge(right.reset_index(names='right'), on='key', suffixes=('_l', '_r'))
+    pairs = pairs[pairs['key'] != '']
+    factor, diff = _date_factor(pairs['date_l'].to_numpy(), pairs['date_r'].to_numpy(), max_days)
+    exact = _best(pairs.assign(confidence=factor, date_diff=diff, method='exact'))
+
+    # Trigram similarity for what is left, blocked by release year
+    unmatched = left.index.difference(exact['left'])
+    candidates = []
+    if len(unmatched) and len(right):
+        keys = pd.concat([left.loc[unmatched, 'key'], right['key']], ignore_index=True)
+        grams = trigram_matrix(keys)
+        left_grams, right_grams = grams[:len(unmatched)], grams[len(unmatched):]
+        left_sizes = np.asarray(left_grams.sum(axis=1)).ravel()
+        right_sizes = np.asarray(right_grams.sum(axis=1)).ravel()
+        left_years = left.loc[unmatched, 'year'].to_numpy()
+        right_years = right['year'].to_numpy()
+
+        for year in np.unique(left_years[~np.isnan(left_years)]):
+            rows = np.flatnonzero(left_years == year)
+            cols = np.flatnonzero(np.abs(right_years - year) <= 1)
+            if len(cols) == 0:
+                continue
+            shared = (left_grams[rows] @ right_grams[cols].T).tocoo()
+            i, j = rows[shared.row], cols[shared.col]
+            similarity = shared.data / (left_sizes[i] + right_sizes[j] - shared.data)
+            keep = similarity >= min_similarity
+            i, j, similarity = i[keep], j[keep], similarity[keep]
+
+            left_rows = unmatched[i]
+            factor, diff = _date_factor(left['date'].to_numpy()[left_rows], right['date'].to_numpy()[j], max_days)
+            candidates.append(pd.DataFrame({'left': left_rows, 'right': j, 'confidence': similarity * factor,
+                                            'date_diff': diff, 'method': 'fuzzy'}))
+
+    fuzzy = _best(pd.concat(candidates, ignore_index=True)) if candidates else exact.iloc[:0]
+    matches = pd.concat([exact, fuzzy], ignore_index=True)[['left', 'right', 'confidence', 'method']]
+    return matches.set_index('left').reindex(np.arange(len(left)))
+
+def dedupe_joined(values, sep=', '):
+    """Drop repeated names inside each sep-joined string, keeping first-seen order"""
+    values = pd.Series(values)
+    exploded = values.str.split(sep).explode().str.strip()
+    exploded = exploded[exploded.notna() & (exploded != '')]
+    exploded = exploded[~exploded.reset_index().duplicated().to_numpy()]
+    return exploded.groupby(level=0).agg(sep.join).reindex(values.index)
@@ -0,0 +1,116 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+# Rows are hashed this many at a time, so only two uint64s per row stay in memory
+CHUNK_SIZE = 100000
+
+def read_chunks(path, columns=None, chunksize=CHUNK_SIZE):
+    """Stream a TSV as string chunks (no type inference, so '1' and '1.0' stay different values)"""
+    return pd.read_csv(path, sep='\t', dtype=str, keep_default_na=False, usecols=columns, chunksize=chunksize)
+
+def read_header(path):
+    return pd.read_csv(path, sep='\t', nrows=0).columns.tolist()
+
+def hash_rows(path, columns, key=None, chunksize=CHUNK_SIZE):
+    """Per-row (key hash, row hash) over `columns`; without a key the row hash is the key"""
+    key_hashes, row_hashes = [], []
+    for chunk in read_chunks(path, columns, chunksize):
+        chunk = chunk[columns]
+        row_hash = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        row_hashes.append(row_hash)
+        key_hashes.append(pd.util.hash_pandas_object(chunk[key], index=False).to_numpy() if key else row_hash)
+
+    hashes = pd.DataFrame({
+        'key': np.concatenate(key_hashes) if key_hashes else np.empty(0, dtype=np.uint64),
+        'row': np.concatenate(row_hashes) if row_hashes else np.empty(0, dtype=np.uint64),
+    })
+    # Repeated keys (or identical rows) are told apart by their occurrence number
+    hashes['occurrence'] = hashes.groupby('key').cumcount()
+    hashes['line'] = np.arange(len(hashes))
+    return hashes
+
+def diff_hashes(old, new):
+    """Line numbers of removed, added, changed and unchanged (old file) rows given both files' hashes"""
+    merged = old.merge(new, on=['key', 'occurrence'], how='outer', suffixes=('_old', '_new'), indicator=True)
+    removed = merged.loc[merged['_merge'] == 'left_only', 'line_old'].astype(np.int64).to_numpy()
+    added = merged.loc[merged['_merge'] == 'right_only', 'line_new'].astype(np.int64).to_numpy()
+    both = merged[merged['_merge'] == 'both']
+    changed = both[both['row_old'] != both['row_new']]
+    unchanged = both.loc[both['row_old'] == both['row_new'], 'line_old'].astype(np.int64).to_numpy()
+    return {
+        'removed': np.sort(removed),
+        'added': np.sort(added),
+        'changed': changed[['line_old', 'line_new']].astype(np.int64).sort_values('line_new'),
+        'unchanged': int(len(both) - len(changed)),
+        'unchanged_lines': np.sort(unchanged),
+    }
+
+def take_lines(path, lines, columns=None, chunksize=CHUNK_SIZE):
+    """Rows at the given 0-based data line numbers (as the index), read in a second streaming pass"""
+    lines = np.asarray(lines, dtype=np.int64)
+    # Chunked reads keep numbering the index across chunks, so it is the line number
+    # usecols keeps the file's own column order, so chunks are put in `columns` order
+    parts = [chunk[chunk.index.isin(lines)] for chunk in read_chunks(path, columns, chunksize)]
+    if columns is not None:
+        parts = [part[columns] for part in parts]
+    if parts:
+        return pd.concat(parts)
+    return pd.DataFrame(columns=columns if columns is not None else read_header(path))
+
+def diff_files(old_path, new_path, key=None, chunksize=CHUNK_SIZE):
+    """Removed, added and changed rows between two TSVs, compared on their common columns.
+
+    With `key` (a list of columns) rows are matched by key and reported as changed
+    when any other value differs; without it whole rows are compared.
+    """
+    old_columns, new_columns = read_header(old_path), read_header(new_path)
+    columns = [column for column in old_columns if column in new_columns]
+    missing = [column for column in key or [] if column not in columns]
+    if missing:
+        raise ValueError(f"Key columns missing from one of the files: {missing}")
+
+    result = diff_hashes(hash_rows(old_path, columns, key, chunksize), hash_rows(new_path, columns, key, chunksize))
+    result['columns'] = columns
+    result['columns_only_old'] = [column for column in old_columns if column not in new_columns]
+    result['columns_only_new'] = [column for column in new_columns if column not in old_columns]
+
+    removed = take_lines(old_path, result['removed'], columns, chunksize)
+    added = take_lines(new_path, result['added'], columns, chunksize)
+
+    changed = result['changed']
+    before = take_lines(old_path, changed['line_old'], columns, chunksize).loc[changed['line_old']]
+    after = take_lines(new_path, changed['line_new'], columns, chunksize).loc[changed['line_new']]
+    differs = before.to_numpy() != after.to_numpy()
+    after = after.reset_index(drop=True)
+    after.insert(0, 'changed_columns', [','.join(np.array(columns)[row]) for row in differs])
+
+    return removed, added, after, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two TSV datasets by hashing rows in chunks")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--key', nargs='+', help="Columns identifying a row, e.g. --key tconst")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--output-prefix', help="Write <prefix>_removed.tsv, <prefix>_added.tsv and <prefix>_changed.tsv")
+    args = parser.parse_args()
+
+    removed, added, changed, result = diff_files(args.old, args.new, args.key, args.chunksize)
+
+    if result['columns_only_old'] or result['columns_only_new']:
+        print(f"Columns only in {args.old}: {result['columns_only_old']}")
+        print(f"Columns only in {args.new}: {result['columns_only_new']}")
+    print(f"Rows in {args.old} but not in {args.new}: {len(removed)}")
+    print(f"Rows in {args.new} but not in {args.old}: {len(added)}")
+    if args.key:
+        print(f"Rows with the same key but different values: {len(changed)}")
+    print(f"Rows in both: {result['unchanged']}")
+
+    if args.output_prefix:
+        removed.to_csv(f"{args.output_prefix}_removed.tsv", sep='\t', index=False)
+        added.to_csv(f"{args.output_prefix}_added.tsv", sep='\t', index=False)
+        changed.to_csv(f"{args.output_prefix}_changed.tsv", sep='\t', index=False)
+
+if __name__ == "__main__":
+    main()
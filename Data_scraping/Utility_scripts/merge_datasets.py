@@ -11,27 +11,23 @@
 
 # print("Merged dataset saved to 'movies_tmdb_merged.tsv'")
 import pandas as pd
+from dataset_diff import diff_files, take_lines
 
-# Load the datasets
-df1 = pd.read_csv('movies_tmdb.tsv', sep='\t')
-df2 = pd.read_csv('movies_tmdb_reversed.tsv', sep='\t')
+# Hash both files chunk by chunk and compare whole rows (pass key=['tconst'] to also see changed rows)
+removed, added, changed, result = diff_files('movies_tmdb.tsv', 'movies_tmdb_reversed.tsv')
 
 # 1. Find rows in df1 but not in df2
-diff_df1 = pd.merge(df1, df2, how='outer', indicator=True).query('_merge == "left_only"').drop('_merge', axis=1)
 print("Rows in df1 but not in df2:")
-print(diff_df1)
+print(removed)
 
 # 2. Find rows in df2 but not in df1
-diff_df2 = pd.merge(df1, df2, how='outer', indicator=True).query('_merge == "right_only"').drop('_merge', axis=1)
 print("\nRows in df2 but not in df1:")
-print(diff_df2)
+print(added)
 
 # 3. Symmetric difference (rows in either df1 or df2, but not both)
-symmetric_diff = pd.concat([diff_df1, diff_df2])
 print("\nSymmetric difference (rows unique to either df1 or df2):")
-print(symmetric_diff)
+print(pd.concat([removed, added]))
 
 # 4. Intersection (rows in both datasets)
-intersection = pd.merge(df1, df2, how='inner')
 print("\nIntersection (rows in both df1 and df2):")
-print(intersection)
+print(take_lines('movies_tmdb.tsv', result['unchanged_lines'], result['columns']))
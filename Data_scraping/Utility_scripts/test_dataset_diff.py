@@ -0,0 +1,35 @@
+import pandas as pd
+
+from dataset_diff import diff_files, take_lines
+
+def write_tsv(path, rows, columns):
+    pd.DataFrame(rows, columns=columns).to_csv(path, sep='\t', index=False)
+    return str(path)
+
+def test_reordered_headers(tmp_path):
+    old = write_tsv(tmp_path / 'old.tsv', [['tt1', '1', 'x'], ['tt2', '2', 'y'], ['tt3', '3', 'z']],
+                    ['tconst', 'a', 'b'])
+    new = write_tsv(tmp_path / 'new.tsv', [['tt1', 'x', '1', 'c1'], ['tt2', 'changed', '2', 'c2'], ['tt4', 'w', '4', 'c4']],
+                    ['tconst', 'b', 'a', 'c'])
+
+    removed, added, changed, result = diff_files(old, new, key=['tconst'], chunksize=2)
+
+    assert result['columns'] == ['tconst', 'a', 'b']
+    assert result['columns_only_new'] == ['c']
+    assert removed.to_dict('records') == [{'tconst': 'tt3', 'a': '3', 'b': 'z'}]
+    assert added.to_dict('records') == [{'tconst': 'tt4', 'a': '4', 'b': 'w'}]
+    assert changed.to_dict('records') == [{'changed_columns': 'b', 'tconst': 'tt2', 'a': '2', 'b': 'changed'}]
+    assert result['unchanged'] == 1
+    unchanged = take_lines(old, result['unchanged_lines'], result['columns'])
+    assert unchanged.to_dict('records') == [{'tconst': 'tt1', 'a': '1', 'b': 'x'}]
+
+def test_whole_row_diff(tmp_path):
+    old = write_tsv(tmp_path / 'old.tsv', [['tt1', '1'], ['tt2', '2'], ['tt2', '2']], ['tconst', 'a'])
+    new = write_tsv(tmp_path / 'new.tsv', [['tt2', '2'], ['tt1', '1.0']], ['tconst', 'a'])
+
+    removed, added, changed, result = diff_files(old, new)
+
+    assert removed.to_dict('records') == [{'tconst': 'tt1', 'a': '1'}, {'tconst': 'tt2', 'a': '2'}]
+    assert added.to_dict('records') == [{'tconst': 'tt1', 'a': '1.0'}]
+    assert len(changed) == 0
+    assert result['unchanged'] == 1
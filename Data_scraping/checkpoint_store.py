@@ -0,0 +1,95 @@
+import sqlite3
+import time
+
+DEFAULT_DB = "scrape_state.sqlite"
+
+class CheckpointStore:
+    """SQLite-backed scrape state: one row per (job, id) with status, attempts and last error"""
+    def __init__(self, job, path=DEFAULT_DB, max_attempts=3, commit_every=100):
+        self.job = job
+        self.max_attempts = max_attempts
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        self.conn = sqlite3.connect(path)
+        # WAL keeps the file consistent if the scraper is killed mid-write
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                job TEXT NOT NULL,
+                id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (job, id)
+            )
+        """)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM items WHERE job = ? LIMIT 1", (self.job,)).fetchone() is None
+
+    def done_ids(self):
+        """Set of ids already scraped successfully"""
+        rows = self.conn.execute("SELECT id FROM items WHERE job = ? AND status = 'done'", (self.job,))
+        return {row[0] for row in rows}
+
+    def exhausted_ids(self):
+        """Ids that failed max_attempts times and are no longer retried"""
+        rows = self.conn.execute(
+            "SELECT id FROM items WHERE job = ? AND status = 'failed' AND attempts >= ?",
+            (self.job, self.max_attempts)
+        )
+        return {row[0] for row in rows}
+
+    def pending(self, ids):
+        """Ids still to scrape: not done and not out of attempts, in input order"""
+        skip = self.done_ids() | self.exhausted_ids()
+        return [str(i) for i in ids if str(i) not in skip]
+
+    def seed_done(self, ids):
+        """Mark ids found in an existing output file as done (one-off migration)"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO items (job, id, status, attempts, updated_at) VALUES (?, ?, 'done', 1, ?)",
+            [(self.job, str(i), now) for i in ids]
+        )
+        self.conn.commit()
+
+    def _record(self, item_id, status, error):
+        self.conn.execute("""
+            INSERT INTO items (job, id, status, attempts, last_error, updated_at) VALUES (?, ?, ?, 1, ?, ?)
+            ON CONFLICT (job, id) DO UPDATE SET
+                status = excluded.status,
+                attempts = items.attempts + 1,
+                last_error = excluded.last_error,
+                updated_at = excluded.updated_at
+        """, (self.job, str(item_id), status, error, time.time()))
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.commit()
+
+    def mark_done(self, item_id):
+        self._record(item_id, 'done', None)
+
+    def mark_failed(self, item_id, error):
+        self._record(item_id, 'failed', str(error))
+
+    def commit(self):
+        self.conn.commit()
+        self.uncommitted = 0
+
+    def summary(self):
+        """Counts per status for this job"""
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM items WHERE job = ? GROUP BY status", (self.job,))
+        return dict(rows.fetchall())
+
+    def close(self):
+        self.commit()
+        self.conn.close()
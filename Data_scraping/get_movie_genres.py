@@ -3,6 +3,9 @@ import os
 import requests
 import csv
 
+from http_utils import RateLimitedSession
+from response_cache import ResponseCache
+
 load_dotenv()
 
 def fetch_movie_genres(api_key, output_file):
@@ -12,8 +15,9 @@ def fetch_movie_genres(api_key, output_file):
         "accept": "application/json"
     }
 
+    session = RateLimitedSession(rate=1, headers=headers, cache=ResponseCache.from_env())
     try:
-        response = requests.get(url, headers=headers)
+        response = session.get(url)
         response.raise_for_status()
         genres = response.json().get("genres", [])
         
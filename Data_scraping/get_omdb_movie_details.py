@@ -1,20 +1,25 @@
 import os
 import csv
-import time
 import requests
 from dotenv import load_dotenv
 
+from checkpoint_store import CheckpointStore
+from http_utils import RateLimitedSession
+from response_cache import ResponseCache
+
 load_dotenv()
 
-def fetch_movie_details_omdb(imdb_id, api_key):
-    url = f"http://www.omdbapi.com/?apikey={api_key}&i={imdb_id}"
+def create_session():
+    """Rate-limited, cached session for OMDb (429s are retried with backoff)"""
+    return RateLimitedSession(rate=10, cache=ResponseCache.from_env())
+
+def fetch_movie_details_omdb(imdb_id, api_key, session):
+    """OMDb details of one movie, fetched through the run's shared session (see create_session)"""
+    url = "http://www.omdbapi.com/"
     
     try:
-        response = requests.get(url)
-        if response.status_code == 429:
-            print("Rate limit reached. Retrying after delay...")
-            time.sleep(5)
-            return fetch_movie_details_omdb(imdb_id, api_key)
+        # The API key is excluded from the cache key, so cached responses survive key changes
+        response = session.get(url, params={"apikey": api_key, "i": imdb_id})
         response.raise_for_status()
         data = response.json()
         
@@ -27,7 +32,7 @@ def fetch_movie_details_omdb(imdb_id, api_key):
         print(f"An error occurred while fetching details for IMDb ID {imdb_id}: {e}")
         return None
 
-def process_movies_omdb(input_file, output_file, api_key, start_id=None):
+def process_movies_omdb(input_file, output_file, api_key, state_db="scrape_state.sqlite"):
     # Check if the file exists to determine if the header should be written
     file_exists = os.path.isfile(output_file)
     
@@ -42,55 +47,71 @@ def process_movies_omdb(input_file, output_file, api_key, start_id=None):
                 "box_office", "production", "website"
             ])
     
-    start_processing = start_id is None
+    store = CheckpointStore("omdb_details", state_db)
+    if file_exists and store.is_empty():
+        # First run with a checkpoint store: take over the IDs already in the output file
+        with open(output_file, "r", encoding="utf-8") as existing:
+            store.seed_done(row["imdb_id"] for row in csv.DictReader(existing, delimiter="\t"))
     with open(input_file, "r", encoding="utf-8") as infile:
         reader = csv.DictReader(infile, delimiter="\t")
-        
+        imdb_ids = []
         for row in reader:
             imdb_id = row.get("tconst")
             if not imdb_id:
                 print("Missing IMDb ID in input row. Skipping...")
                 continue
-            
-            if not start_processing:
-                if imdb_id == start_id:
-                    start_processing = True
-                else:
-                    continue
-            
+            imdb_ids.append(imdb_id)
+    
+    imdb_ids = store.pending(imdb_ids)
+    print(f"{len(imdb_ids)} IMDb IDs left to fetch ({store.summary()})")
+    
+    session = create_session()
+    try:
+        write_movies_omdb(imdb_ids, output_file, api_key, session, store)
+    finally:
+        session.close()
+        store.close()
+
+def write_movies_omdb(imdb_ids, output_file, api_key, session, store):
+    """Fetch and append each ID's details, checkpointing every row"""
+    with open(output_file, "a", newline="", encoding="utf-8") as outfile:
+        writer = csv.writer(outfile, delimiter="\t")
+        for imdb_id in imdb_ids:
             print(f"Fetching details for IMDb ID: {imdb_id}")
-            movie_details = fetch_movie_details_omdb(imdb_id, api_key)
+            movie_details = fetch_movie_details_omdb(imdb_id, api_key, session)
             
             if movie_details:
-                with open(output_file, "a", newline="", encoding="utf-8") as outfile:
-                    writer = csv.writer(outfile, delimiter="\t")
-                    writer.writerow([
-                        imdb_id,
-                        movie_details.get("Title", ""),
-                        movie_details.get("Year", ""),
-                        movie_details.get("Rated", ""),
-                        movie_details.get("Released", ""),
-                        movie_details.get("Runtime", ""),
-                        movie_details.get("Genre", ""),
-                        movie_details.get("Director", ""),
-                        movie_details.get("Writer", ""),
-                        movie_details.get("Actors", ""),
-                        movie_details.get("Plot", ""),
-                        movie_details.get("Language", ""),
-                        movie_details.get("Country", ""),
-                        movie_details.get("Awards", ""),
-                        movie_details.get("Poster", ""),
-                        movie_details.get("Metascore", ""),
-                        movie_details.get("imdbRating", ""),
-                        movie_details.get("imdbVotes", ""),
-                        movie_details.get("Type", ""),
-                        movie_details.get("DVD", ""),
-                        movie_details.get("BoxOffice", ""),
-                        movie_details.get("Production", ""),
-                        movie_details.get("Website", "")
-                    ])
+                writer.writerow([
+                    imdb_id,
+                    movie_details.get("Title", ""),
+                    movie_details.get("Year", ""),
+                    movie_details.get("Rated", ""),
+                    movie_details.get("Released", ""),
+                    movie_details.get("Runtime", ""),
+                    movie_details.get("Genre", ""),
+                    movie_details.get("Director", ""),
+                    movie_details.get("Writer", ""),
+                    movie_details.get("Actors", ""),
+                    movie_details.get("Plot", ""),
+                    movie_details.get("Language", ""),
+                    movie_details.get("Country", ""),
+                    movie_details.get("Awards", ""),
+                    movie_details.get("Poster", ""),
+                    movie_details.get("Metascore", ""),
+                    movie_details.get("imdbRating", ""),
+                    movie_details.get("imdbVotes", ""),
+                    movie_details.get("Type", ""),
+                    movie_details.get("DVD", ""),
+                    movie_details.get("BoxOffice", ""),
+                    movie_details.get("Production", ""),
+                    movie_details.get("Website", "")
+                ])
+                outfile.flush()
+                store.mark_done(imdb_id)
+                store.commit()
                 print(f"Details saved for IMDb ID: {imdb_id}")
             else:
+                store.mark_failed(imdb_id, "no movie details returned")
                 print(f"Failed to fetch details for IMDb ID: {imdb_id}")
 
 if __name__ == "__main__":
@@ -101,10 +122,7 @@ if __name__ == "__main__":
     
     input_file = "movies.tsv"
     output_file = "movies_omdb.tsv"
-    
-    # Define the start ID here or use None to process all records.
-    start_id = input("Enter start IMDb ID (or press Enter to start from the beginning): ").strip() or None
 
     print(f"Starting processing of {input_file}")
-    process_movies_omdb(input_file, output_file, api_key, start_id)
+    process_movies_omdb(input_file, output_file, api_key)
     print(f"Processing complete. Results saved to {output_file}")
@@ -1,25 +1,36 @@
 import os
 import csv
-import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from dotenv import load_dotenv
 import pandas as pd
 
+from http_utils import RateLimitedSession
+from checkpoint_store import CheckpointStore
+from response_cache import ResponseCache
+
 load_dotenv()
 
-def fetch_movie_details(tconst, api_key):
-    url = f"https://api.themoviedb.org/3/find/{tconst}?external_source=imdb_id"
-    headers = {
+TMDB_API_URL = os.getenv("TMDB_API_URL", "https://api.themoviedb.org/3")
+# TMDB allows roughly 50 requests per second per IP; stay a bit under it
+TMDB_RATE_LIMIT = 40
+
+HEADER = ["imdb_id", "tmdb_id", "title", "overview", "poster_path", "original_language", "genre_ids", "release_date", "popularity"]
+
+def create_session(api_key, rate=TMDB_RATE_LIMIT, pool_size=32):
+    """Pooled, rate-limited session authenticated for TMDB"""
+    return RateLimitedSession(rate=rate, pool_size=pool_size, cache=ResponseCache.from_env(), headers={
         "Authorization": f"Bearer {api_key}",
         "accept": "application/json"
-    }
+    })
+
+def fetch_movie_details(tconst, session, base_url=TMDB_API_URL):
+    """TMDB match of one IMDb ID, fetched through the run's shared session (see create_session)"""
+    url = f"{base_url}/find/{tconst}?external_source=imdb_id"
     
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 429:
-            print("Rate limit reached. Retrying after delay...")
-            time.sleep(5)  
-            return fetch_movie_details(tconst, api_key)  
+        response = session.get(url)
         response.raise_for_status()
         data = response.json()
         
@@ -34,17 +45,33 @@ def fetch_movie_details(tconst, api_key):
         return None
 
 
-def process_movies(input_file, merged_file, api_key):
-    # Load the merged file to get existing IMDb IDs
+def format_row(tconst, movie_details):
+    return [
+        tconst, 
+        movie_details.get("id", ""),  # TMDB ID
+        movie_details.get("title", ""),  
+        movie_details.get("overview", ""),  
+        movie_details.get("poster_path", ""),  
+        movie_details.get("original_language", ""),  
+        ",".join(map(str, movie_details.get("genre_ids", []))),  
+        movie_details.get("release_date", ""),  
+        movie_details.get("popularity", "")  
+    ]
+
+
+def process_movies(input_file, merged_file, api_key, workers=16, rate=TMDB_RATE_LIMIT, batch_size=100, base_url=TMDB_API_URL,
+                   state_db="scrape_state.sqlite"):
+    store = CheckpointStore("tmdb_details", state_db)
     if os.path.exists(merged_file):
-        merged_df = pd.read_csv(merged_file, sep="\t")
-        existing_ids = set(merged_df["imdb_id"])
+        if store.is_empty():
+            # First run with a checkpoint store: take over the IDs already in the merged file
+            store.seed_done(pd.read_csv(merged_file, sep="\t", usecols=["imdb_id"])["imdb_id"])
     else:
-        existing_ids = set()
         with open(merged_file, "w", newline="", encoding="utf-8") as outfile:
             writer = csv.writer(outfile, delimiter="\t")
-            writer.writerow(["imdb_id", "tmdb_id", "title", "overview", "poster_path", "original_language", "genre_ids", "release_date", "popularity"])
+            writer.writerow(HEADER)
 
+    tconsts = []
     with open(input_file, "r", encoding="utf-8") as infile:
         reader = csv.DictReader(infile, delimiter="\t")
 
@@ -53,31 +80,51 @@ def process_movies(input_file, merged_file, api_key):
             if not tconst:
                 print("Missing tconst in input row. Skipping...")
                 continue
+            tconsts.append(tconst)
 
-            if tconst in existing_ids:
-                print(f"IMDb ID {tconst} already exists in the merged file. Skipping...")
-                continue
+    tconsts = store.pending(tconsts)
+    print(f"Fetching details for {len(tconsts)} IMDb IDs ({store.summary()})")
+    session = create_session(api_key, rate=rate, pool_size=workers)
+    try:
+        write_movies(tconsts, merged_file, session, store, workers, batch_size, base_url)
+    finally:
+        session.close()
+        store.close()
+
+def write_movies(tconsts, merged_file, session, store, workers, batch_size, base_url=TMDB_API_URL):
+    """Fetch on `workers` threads and append rows in batches, checkpointing after each write"""
+    fetch = partial(fetch_movie_details, session=session, base_url=base_url)
+
+    with open(merged_file, "a", newline="", encoding="utf-8") as outfile, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        writer = csv.writer(outfile, delimiter="\t")
+        buffer = []
+
+        def flush():
+            # Output first, then checkpoint: a crash in between can only cause a re-fetch, never a gap
+            writer.writerows(row for _, row in buffer)
+            outfile.flush()
+            for tconst, _ in buffer:
+                store.mark_done(tconst)
+            store.commit()
+            buffer.clear()
+
+        # Submit in windows so at most a few batches are in flight at once
+        window = max(batch_size, workers * 4)
+        for start in range(0, len(tconsts), window):
+            chunk = tconsts[start:start + window]
+            for tconst, movie_details in zip(chunk, executor.map(fetch, chunk)):
+                if movie_details:
+                    buffer.append((tconst, format_row(tconst, movie_details)))
+                else:
+                    print(f"Failed to fetch details for IMDb ID: {tconst}")
+                    store.mark_failed(tconst, "no movie details returned")
+
+                if len(buffer) >= batch_size:
+                    flush()
+            print(f"Processed {min(start + window, len(tconsts))}/{len(tconsts)}")
 
-            print(f"Fetching details for IMDb ID: {tconst}")
-            movie_details = fetch_movie_details(tconst, api_key)
-
-            if movie_details:
-                with open(merged_file, "a", newline="", encoding="utf-8") as outfile:
-                    writer = csv.writer(outfile, delimiter="\t")
-                    writer.writerow([
-                        tconst, 
-                        movie_details.get("id", ""),  # TMDB ID
-                        movie_details.get("title", ""),  
-                        movie_details.get("overview", ""),  
-                        movie_details.get("poster_path", ""),  
-                        movie_details.get("original_language", ""),  
-                        ",".join(map(str, movie_details.get("genre_ids", []))),  
-                        movie_details.get("release_date", ""),  
-                        movie_details.get("popularity", "")  
-                    ])
-                print(f"Details saved for IMDb ID: {tconst}")
-            else:
-                print(f"Failed to fetch details for IMDb ID: {tconst}")
+        flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+
+from response_cache import CacheMissError
+
+# HTTP statuses worth retrying: rate limited or temporary server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimitedSession:
+    """Pooled requests session with a token-bucket rate limit and exponential backoff.
+
+    With per_host=True every host gets its own bucket of `rate` requests per second.
+    Responses are served from and stored in `cache` (a ResponseCache) when given.
+    """
+    def __init__(self, rate=40, pool_size=32, max_retries=5, backoff=1.0, max_backoff=60.0, headers=None, per_host=False,
+                 cache=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.rate = rate
+        self.per_host = per_host
+        self.buckets = {}
+        self.buckets_lock = threading.Lock()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = cache
+
+    def _bucket(self, url):
+        """Token bucket for the url's host (or the shared one)"""
+        host = urlsplit(url).netloc if self.per_host else None
+        with self.buckets_lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate)
+            return self.buckets[host]
+
+    def _retry_delay(self, response, attempt):
+        """Seconds to wait before the next attempt, honoring Retry-After when present"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return delay * (0.5 + random.random() / 2)
+
+    def get(self, url, params=None, **kwargs):
+        """GET with rate limiting; retries 429/5xx and connection errors, raises once retries run out"""
+        if self.cache is not None:
+            cached = self.cache.get(url, params)
+            if cached is not None:
+                return cached
+            if self.cache.offline:
+                raise CacheMissError(f"{url} is not in the response cache (offline mode)")
+
+        kwargs.setdefault('timeout', 30)
+        bucket = self._bucket(url)
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            try:
+                response = self.session.get(url, params=params, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    if self.cache is not None:
+                        self.cache.put(url, response, params)
+                    return response
+
+            delay = self._retry_delay(response, attempt)
+            status = response.status_code if response is not None else 'connection error'
+            print(f"Got {status} for {url}. Retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Statuses worth replaying: real pages and permanent misses, never rate limits or server errors
+CACHEABLE_STATUSES = {200, 404}
+# Query parameters that identify the caller, not the resource
+IGNORED_PARAMS = {'apikey', 'api_key'}
+
+class CacheMissError(requests.exceptions.RequestException):
+    """Raised in offline mode when a URL is not in the cache"""
+
+class ResponseCache:
+    """Content-addressed, gzip-compressed on-disk HTTP response cache.
+
+    Entries are keyed by the normalized URL plus params, expire after `ttl`
+    seconds (never if None) and the least recently used ones are evicted once
+    the cache grows past `max_bytes`. With offline=True misses raise
+    CacheMissError instead of going to the network.
+    """
+    def __init__(self, directory='http_cache', ttl=None, max_bytes=None, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Only eviction needs the total size, so unbounded caches skip the directory walk
+        self.size = sum(os.path.getsize(path) for path in self._entries()) if max_bytes is not None else 0
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by SCRAPE_CACHE_DIR, SCRAPE_CACHE_TTL, SCRAPE_CACHE_MAX_MB and SCRAPE_OFFLINE"""
+        ttl = os.getenv('SCRAPE_CACHE_TTL')
+        max_mb = os.getenv('SCRAPE_CACHE_MAX_MB')
+        return cls(
+            directory=os.getenv('SCRAPE_CACHE_DIR', 'http_cache'),
+            ttl=float(ttl) if ttl else None,
+            max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+            offline=os.getenv('SCRAPE_OFFLINE', '') not in ('', '0', 'false'),
+        )
+
+    def key(self, url, params=None):
+        """sha256 of the URL with sorted query and params, minus caller credentials"""
+        parts = urlsplit(url)
+        query = parse_qsl(parts.query, keep_blank_values=True) + list((params or {}).items())
+        query = sorted((k, str(v)) for k, v in query if k not in IGNORED_PARAMS)
+        normalized = urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ''))
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.gz')
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.gz'):
+                    yield os.path.join(root, name)
+
+    def get(self, url, params=None):
+        """Cached requests.Response or None"""
+        path = self._path(self.key(url, params))
+        try:
+            with gzip.open(path, 'rb') as file:
+                meta = json.loads(file.readline())
+                content = file.read()
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+
+        if self.ttl is not None and time.time() - meta['stored_at'] > self.ttl:
+            self._remove(path)
+            return None
+        # Touch the entry so eviction is least-recently-used
+        os.utime(path)
+
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = meta['encoding']
+        response.url = meta['url']
+        response._content = content
+        return response
+
+    def put(self, url, response, params=None):
+        """Store a response if its status is cacheable"""
+        if response.status_code not in CACHEABLE_STATUSES:
+            return
+        path = self._path(self.key(url, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {
+            'url': response.url or url,
+            'status': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() in ('content-type', 'retry-after')},
+            'encoding': response.encoding,
+            'stored_at': time.time(),
+        }
+        # Write to a temp file and rename so readers never see a partial entry
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with gzip.open(tmp_path, 'wb') as file:
+            file.write(json.dumps(meta).encode('utf-8') + b'\n')
+            file.write(response.content)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.size += os.path.getsize(path) - previous
+            if self.max_bytes is not None and self.size > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self.lock:
+            self.size -= size
+
+    def _evict(self):
+        """Drop least recently used entries down to 90% of max_bytes (caller holds the lock)"""
+        entries = sorted(((os.path.getmtime(p), os.path.getsize(p), p) for p in self._entries()))
+        target = 0.9 * self.max_bytes
+        for _, size, path in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.size -= size
@@ -0,0 +1,261 @@
+import hashlib
+import os
+from typing import List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, check_scoring, make_scorer, mean_absolute_error, precision_score, recall_score
+from sklearn.model_selection import StratifiedKFold, cross_val_predict, cross_validate
+
+# Fitted fold models, out-of-fold predictions and fold scores, shared by the ROI and Revenue experiments
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cv_cache')
+
+def create_ordinal_labels(values: np.ndarray,
+                          n_classes: int = 3,
+                          thresholds: Optional[List[float]] = None) -> np.ndarray:
+    if n_classes < 2:
+        raise ValueError("n_classes must be at least 2")
+
+    if thresholds is not None:
+        if len(thresholds) != n_classes - 1:
+            raise ValueError(f"Expected {n_classes-1} thresholds for {n_classes} classes, "
+                             f"but got {len(thresholds)}")
+    else:
+        percentiles = np.linspace(0, 100, n_classes + 1)[1:-1]
+        thresholds = [np.percentile(values, p) for p in percentiles]
+
+    # Initialize labels array with zeros
+    labels = np.zeros(len(values))
+
+    # Assign labels based on thresholds
+    for i, threshold in enumerate(thresholds, 1):
+        labels[values > threshold] = i
+
+    return labels.astype(int)
+
+def weighted_accuracy_score(y_true, y_pred):
+    nb_classes = np.max(y_true) - np.min(y_true)
+    differences = np.abs(y_true - y_pred)
+    error = np.sum(differences) / (nb_classes*len(y_true))
+    acc = 1 - error
+    return acc
+
+BINARY_SCORING = {
+    'accuracy': make_scorer(accuracy_score),
+    'precision': make_scorer(precision_score),
+    'recall': make_scorer(recall_score)
+}
+
+ORDINAL_SCORING = {
+    'MAE': make_scorer(mean_absolute_error),
+    'accuracy': make_scorer(accuracy_score),
+    'weighted_acc': make_scorer(weighted_accuracy_score)
+}
+
+def dataset_hash(X, y):
+    """Hash of the feature matrix and target, so a changed dataset never reuses cached folds"""
+    digest = hashlib.sha1()
+    for data in (X, y):
+        frame = pd.DataFrame(np.asarray(data))
+        digest.update(f"{frame.shape}".encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+def model_key(model):
+    """Model class plus every (nested) hyperparameter"""
+    params = sorted((name, repr(value)) for name, value in model.get_params(deep=True).items())
+    return f"{type(model).__name__}-{hashlib.sha1(repr(params).encode('utf-8')).hexdigest()[:16]}"
+
+def _rows(X, index):
+    return X.iloc[index] if hasattr(X, 'iloc') else np.asarray(X)[index]
+
+def _run_path(cache_dir, model, X, y, cv):
+    if cache_dir is None:
+        return None
+    fold_key = hashlib.sha1(repr(cv).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{dataset_hash(X, y)}-{fold_key}", f"{model_key(model)}.joblib")
+
+def _save_run(run, path):
+    if path is not None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(run, path)
+
+def _out_of_fold(estimators, X, splits, output):
+    """output(estimator, X) of each fold model on its held-out rows, in row order"""
+    folds = [output(estimator, _rows(X, test)) for estimator, (_, test) in zip(estimators, splits)]
+    result = np.empty(sum(len(test) for _, test in splits), dtype=folds[0].dtype)
+    for (_, test), fold in zip(splits, folds):
+        result[test] = fold
+    return result
+
+def _predict(estimator, X):
+    return estimator.predict(X)
+
+def positive_score(estimator, X):
+    """Positive-class probability, or the decision function of models without one (e.g. linear SVC)"""
+    if hasattr(estimator, 'predict_proba'):
+        return estimator.predict_proba(X)[:, 1]
+    return estimator.decision_function(X)
+
+def cross_validate_cached(model, X, y, cv, scoring, n_jobs=-1, cache_dir=CACHE_DIR):
+    """Cross-validate with each fold trained once, reusing the folds of an identical earlier run.
+
+    Runs are keyed by (dataset hash, folds, model params). A cached run holds the
+    fitted fold models and the out-of-fold predictions; scores are kept per metric
+    name, and a metric not computed before is scored on the cached fold models
+    without retraining. Folds are fitted on `n_jobs` processes.
+    Returns {'scores': {metric: per-fold array}, 'predictions', 'estimators', 'splits'}.
+    """
+    splits = list(cv.split(X, y))
+    path = _run_path(cache_dir, model, X, y, cv)
+
+    if path is not None and os.path.exists(path):
+        result = joblib.load(path)
+        missing = [name for name in scoring if name not in result['scores']]
+        for name in missing:
+            # Each cached fold model is scored on the rows it was held out from
+            scorer = check_scoring(model, scoring=scoring[name])
+            result['scores'][name] = np.array([scorer(estimator, _rows(X, test), _rows(y, test))
+                                               for estimator, (_, test) in zip(result['estimators'], result['splits'])])
+        if missing:
+            _save_run(result, path)
+    else:
+        output = cross_validate(model, X, y, cv=splits, scoring=scoring, n_jobs=n_jobs, return_estimator=True)
+        result = {
+            'scores': {name: output[f'test_{name}'] for name in scoring},
+            'predictions': _out_of_fold(output['estimator'], X, splits, _predict),
+            'estimators': output['estimator'],
+            'splits': splits,
+        }
+        _save_run(result, path)
+
+    result['scores'] = {name: result['scores'][name] for name in scoring}
+    return result
+
+def _fit_fold(model, X, y, train):
+    return clone(model).fit(_rows(X, train), _rows(y, train))
+
+def out_of_fold(models, X, y, cv, n_jobs=-1, cache_dir=CACHE_DIR, positive_scores=False):
+    """Cross-validation runs of several models, in the same cache as cross_validate_cached.
+
+    Models without a cached run are fitted together, one (model, fold) pair per job,
+    so all `n_jobs` cores stay busy across models instead of within one. Runs are
+    stored exactly like cross_validate_cached's (scores are filled in when it is
+    next asked for them), so individual evaluations and ensembles share fold models
+    and out-of-fold predictions. With positive_scores, each run also gets the
+    out-of-fold positive_score ('decision') of its fold models, for stacking.
+    Runs are looked up by model, not by name, so models with identical parameters
+    are fitted once and share a run. Returns {name: run} in the order of `models`.
+    """
+    splits = list(cv.split(X, y))
+    keys = {name: model_key(model) for name, model in models.items()}
+    unique = {key: name for name, key in reversed(list(keys.items()))}
+    paths = {key: _run_path(cache_dir, models[name], X, y, cv) for key, name in unique.items()}
+    runs = {key: joblib.load(path) for key, path in paths.items() if path is not None and os.path.exists(path)}
+
+    missing = [key for key in unique if key not in runs]
+    fitted = Parallel(n_jobs=n_jobs)(delayed(_fit_fold)(models[unique[key]], X, y, train)
+                                     for key in missing for train, _ in splits)
+    for i, key in enumerate(missing):
+        estimators = fitted[i * len(splits):(i + 1) * len(splits)]
+        runs[key] = {
+            'scores': {},
+            'predictions': _out_of_fold(estimators, X, splits, _predict),
+            'estimators': estimators,
+            'splits': splits,
+        }
+        _save_run(runs[key], paths[key])
+
+    for key, run in runs.items():
+        if positive_scores and 'decision' not in run:
+            run['decision'] = _out_of_fold(run['estimators'], X, run['splits'], positive_score)
+            _save_run(run, paths[key])
+    return {name: runs[key] for name, key in keys.items()}
+
+class BinaryClassifier:
+    def __init__(self, model, X, y, folds = 10, n_jobs=-1, cache_dir=CACHE_DIR):
+        self.model = model
+        self.X = X
+        self.y = y
+        self.folds = folds
+        self.n_jobs = n_jobs
+        self.cache_dir = cache_dir
+
+    def evaluate(self):
+        # Perform K-fold cross-validation, training each fold once for all metrics
+        cv = StratifiedKFold(n_splits=self.folds, shuffle=True, random_state=42)
+        result = cross_validate_cached(self.model, self.X, self.y, cv, BINARY_SCORING, self.n_jobs, self.cache_dir)
+        self.predictions = result['predictions']
+        self.scores = scores = {metric: values.mean() for metric, values in result['scores'].items()}
+
+        # Print the results
+        print(f"Accuracy: {scores['accuracy']:.4f}")
+        print(f"Precision: {scores['precision']:.4f}")
+        print(f"Recall: {scores['recall']:.4f}")
+
+class OrdinalClassifier:
+    def __init__(self, model, X, y, folds=5, n_jobs=-1, cache_dir=CACHE_DIR):
+        self.model = model
+        self.X = X
+        self.y = y
+        self.folds = folds
+        self.n_jobs = n_jobs
+        self.cache_dir = cache_dir
+
+    def evaluate(self):
+        cv = StratifiedKFold(n_splits=self.folds, shuffle=True, random_state=42)
+        result = cross_validate_cached(self.model, self.X, self.y, cv, ORDINAL_SCORING, self.n_jobs, self.cache_dir)
+        scores = {metric: values.mean() for metric, values in result['scores'].items()}
+
+        return scores
+
+class EnsembleBinaryClassifier:
+    """Majority vote ('vote') or stacking ('stack') of models, built from their out-of-fold predictions.
+
+    Models passed as a list are keyed by position, so a model listed twice votes
+    twice. With an even number of voters a tied vote predicts `tie`, 0 by default
+    (what scipy's mode did). Stacking trains `meta_model` (a logistic regression by
+    default) on the models' out-of-fold positive scores and reports its own
+    out-of-fold predictions on the same folds.
+    """
+    def __init__(self, models, X, y, folds=5, method='vote', meta_model=None, n_jobs=-1, cache_dir=CACHE_DIR, tie=0):
+        if isinstance(models, dict):
+            self.models = dict(models)
+        else:
+            self.models = {f"{i}-{model_key(model)}": model for i, model in enumerate(models)}
+        self.X = X
+        self.y = y
+        self.folds = folds
+        self.method = method
+        self.meta_model = meta_model if meta_model is not None else LogisticRegression(max_iter=500)
+        self.n_jobs = n_jobs
+        self.cache_dir = cache_dir
+        self.tie = tie
+
+    def evaluate(self):
+        if self.method not in ('vote', 'stack'):
+            raise ValueError(f"Unknown ensemble method: {self.method}")
+        cv = StratifiedKFold(n_splits=self.folds, shuffle=True, random_state=42)
+        runs = out_of_fold(self.models, self.X, self.y, cv, self.n_jobs, self.cache_dir,
+                           positive_scores=self.method == 'stack')
+
+        if self.method == 'vote':
+            votes = np.array([run['predictions'] for run in runs.values()]).sum(axis=0)
+            ensemble = np.where(2 * votes == len(runs), self.tie, (2 * votes > len(runs)).astype(int))
+        else:
+            features = np.column_stack([run['decision'] for run in runs.values()])
+            ensemble = cross_val_predict(self.meta_model, features, self.y, cv=cv, n_jobs=self.n_jobs)
+        self.predictions = ensemble
+
+        self.scores = scores = {
+            'accuracy': accuracy_score(self.y, ensemble),
+            'precision': precision_score(self.y, ensemble),
+            'recall': recall_score(self.y, ensemble)
+        }
+
+        for metric, score in scores.items():
+            print(f"{metric.capitalize()}: {score:.4f}")
@@ -0,0 +1,219 @@
+import csv
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+LABELS = ("YES", "NO", "UNKNOWN")
+
+BATCH_INSTRUCTIONS = """
+    You're going to be given a JSON list of movies, each with an "id" and a "title" formatted as "Name (Year)".
+    Answer every movie independently and reply with JSON only, in the form:
+    {"results": [{"id": <id>, "label": "<LABEL>"}, ...]}
+    where <LABEL> is one of: %s.
+"""
+
+MULTI_LABEL_INSTRUCTIONS = """
+    You're going to be given a JSON list of movies, each with an "id" and a "title" formatted as "Name (Year)".
+    Answer every question for every movie independently and reply with JSON only, in the form:
+    {"results": [{"id": <id>, %s}, ...]}
+    where every <LABEL> is one of: %s.
+"""
+
+class RateLimiter:
+    """Allows at most `requests_per_minute` calls, spaced evenly"""
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+class GeminiBackend:
+    """Stateless Gemini backend: every batch is an independent generate_content call"""
+    def __init__(self, system_prompt, api_key, model_name="gemini-2.0-flash-exp", max_output_tokens=8192):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config={
+                "temperature": 0,
+                "top_p": 0.95,
+                "top_k": 40,
+                "max_output_tokens": max_output_tokens,
+                "response_mime_type": "application/json",
+            },
+            system_instruction=system_prompt,
+        )
+
+    def complete(self, prompt):
+        return self.model.generate_content(prompt).text
+
+class FakeBackend:
+    """Local stand-in for a model: answers each title with `label_fn(title)` (a label, or a dict of task -> label)"""
+    def __init__(self, label_fn):
+        self.label_fn = label_fn
+        self.calls = 0
+
+    def complete(self, prompt):
+        self.calls += 1
+        items = json.loads(prompt)
+        results = []
+        for item in items:
+            answer = self.label_fn(item["title"])
+            results.append({"id": item["id"], **(answer if isinstance(answer, dict) else {"label": answer})})
+        return json.dumps({"results": results})
+
+def _load_results(text):
+    # Models sometimes wrap JSON in a markdown fence
+    text = re.sub(r'^```(?:json)?|```$', '', text.strip()).strip()
+    results = json.loads(text)
+    if isinstance(results, dict):
+        results = results.get("results", [])
+    return results
+
+def _normalize_label(value):
+    return str(value).strip().strip('"').upper()
+
+def _entries(text):
+    """(id, entry) for every well-formed entry; a missing or non-numeric id only drops its own entry"""
+    for result in _load_results(text):
+        if not isinstance(result, dict):
+            continue
+        try:
+            yield int(result["id"]), result
+        except (KeyError, TypeError, ValueError):
+            continue
+
+def parse_response(text, labels=LABELS):
+    """Map id -> label from a batch response; ignores malformed entries and labels it does not recognize"""
+    parsed = {}
+    for i, result in _entries(text):
+        label = _normalize_label(result.get("label", ""))
+        if label in labels:
+            parsed[i] = label
+    return parsed
+
+def parse_multi_response(text, tasks, labels=LABELS):
+    """Map id -> {task: label} from a batch response; malformed entries and ids missing any task are left out"""
+    parsed = {}
+    for i, result in _entries(text):
+        answer = {task: _normalize_label(result.get(task, "")) for task in tasks}
+        if all(label in labels for label in answer.values()):
+            parsed[i] = answer
+    return parsed
+
+class BatchClassifier:
+    """Packs `batch_size` titles per stateless request and parses a structured answer"""
+    def __init__(self, backend, labels=LABELS, batch_size=50, requests_per_minute=10, max_retries=3):
+        self.backend = backend
+        self.labels = labels
+        self.batch_size = batch_size
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.max_retries = max_retries
+
+    def parse(self, text):
+        return parse_response(text, self.labels)
+
+    def classify_batch(self, titles):
+        """Labels for a list of titles; titles the model did not answer map to None"""
+        prompt = json.dumps([{"id": i, "title": title} for i, title in enumerate(titles)])
+        answers = {}
+        for attempt in range(self.max_retries):
+            self.rate_limiter.wait()
+            try:
+                answers = self.parse(self.backend.complete(prompt))
+                break
+            except Exception as e:
+                print(f"Batch failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+        return [answers.get(i) for i in range(len(titles))]
+
+    def classify(self, titles):
+        """Yield (batch_start, labels) for consecutive batches of titles"""
+        for start in range(0, len(titles), self.batch_size):
+            yield start, self.classify_batch(titles[start:start + self.batch_size])
+
+class MultiLabelClassifier(BatchClassifier):
+    """Asks every task in `tasks` for each title in the same request; answers are dicts of task -> label"""
+    def __init__(self, backend, tasks, **kwargs):
+        super().__init__(backend, **kwargs)
+        self.tasks = list(tasks)
+
+    def parse(self, text):
+        return parse_multi_response(text, self.tasks, self.labels)
+
+def multi_label_prompt(definitions, labels=LABELS):
+    """System prompt asking every task in `definitions` (task -> question text) at once"""
+    questions = "\n".join(f"    {task}: {question.strip()}" for task, question in definitions.items())
+    fields = ", ".join(f'"{task}": "<LABEL>"' for task in definitions)
+    return questions + "\n" + MULTI_LABEL_INSTRUCTIONS % (fields, ", ".join(labels))
+
+def prompt_version(prompt):
+    """Short content hash of a prompt, so edited prompts invalidate cached answers"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+class AnswerCache:
+    """SQLite cache of model answers keyed by (title, year, prompt version)"""
+    def __init__(self, path, version):
+        self.version = version
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "title TEXT NOT NULL, year TEXT NOT NULL, version TEXT NOT NULL, answer TEXT NOT NULL, "
+            "PRIMARY KEY (title, year, version))"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys):
+        """Cached answers for the given (title, year) keys under the current version"""
+        found = {}
+        for title, year, answer in self.conn.execute(
+                "SELECT title, year, answer FROM answers WHERE version = ?", (self.version,)):
+            found[(title, year)] = json.loads(answer)
+        return {key: found[key] for key in keys if key in found}
+
+    def put_many(self, answers):
+        """Store {(title, year): answer} and commit"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO answers (title, year, version, answer) VALUES (?, ?, ?, ?)",
+            [(title, year, self.version, json.dumps(answer)) for (title, year), answer in answers.items()],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def format_title(title, year):
+    return f"{title} ({year})"
+
+def classify_movies(df, classifier, output_file, fail_log):
+    """Classify every row of df and append tconst, Title, Year, Response rows to output_file"""
+    titles = [format_title(title, year) for title, year in zip(df["primaryTitle"], df["startYear"])]
+    failures = []
+
+    with open(output_file, "a", encoding="utf-8", newline="") as result_file, open(fail_log, "a", encoding="utf-8") as fail_file:
+        writer = csv.writer(result_file, delimiter="\t")
+        writer.writerow(["tconst", "Title", "Year", "Response"])
+
+        for start, labels in classifier.classify(titles):
+            batch = df.iloc[start:start + len(labels)]
+            for (imdb_id, title, year), label in zip(batch[["tconst", "primaryTitle", "startYear"]].itertuples(index=False), labels):
+                if label is None:
+                    failures.append(imdb_id)
+                    fail_file.write(f"{imdb_id}\n")
+                else:
+                    writer.writerow([imdb_id, title, year, label])
+            result_file.flush()
+            fail_file.flush()
+            print(f"Processed {start + len(labels)}/{len(titles)}")
+
+    return failures
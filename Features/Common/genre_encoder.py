@@ -0,0 +1,70 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from movie_store import split_list
+
+# The shared vocabulary; ids are column positions in every genre matrix
+VOCABULARY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'genre_to_id.json')
+
+class GenreEncoder:
+    """Multi-hot encoder for the genres column with a fixed, persisted genre_to_id vocabulary"""
+    def __init__(self, genre_to_id):
+        self.genre_to_id = dict(genre_to_id)
+
+    @classmethod
+    def load(cls, path=VOCABULARY_FILE):
+        with open(path, encoding='utf-8') as file:
+            return cls(json.load(file))
+
+    def save(self, path=VOCABULARY_FILE):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.genre_to_id, file, indent=2)
+            file.write('\n')
+
+    @property
+    def genres(self):
+        """Genre names in column order"""
+        return sorted(self.genre_to_id, key=self.genre_to_id.get)
+
+    def fit(self, genres):
+        """Append genres not yet in the vocabulary, keeping existing ids"""
+        for genre in _explode(genres).unique():
+            if genre not in self.genre_to_id:
+                self.genre_to_id[genre] = len(self.genre_to_id)
+        return self
+
+    def transform(self, genres):
+        """Sparse (n x n_genres) uint8 CSR matrix of a comma-joined (or list) genres column"""
+        exploded = _explode(genres)
+        ids = exploded.map(self.genre_to_id)
+        if ids.isna().any():
+            raise KeyError(f"Genres missing from the vocabulary: {sorted(exploded[ids.isna()].unique())}")
+
+        matrix = sp.csr_matrix(
+            (np.ones(len(ids), dtype=np.uint8), (exploded.index.to_numpy(), ids.to_numpy(dtype=np.int64))),
+            shape=(len(genres), len(self.genre_to_id)),
+        )
+        # A genre listed twice still counts once
+        matrix.data[:] = 1
+        return matrix
+
+    def to_bitmask(self, matrix):
+        """One integer per movie with bit i set for genre id i"""
+        if len(self.genre_to_id) > 63:
+            raise ValueError("Bitmasks hold at most 63 genres")
+        weights = np.left_shift(np.int64(1), np.arange(len(self.genre_to_id), dtype=np.int64))
+        return np.asarray(matrix @ weights).ravel().astype(np.int64)
+
+    def from_bitmask(self, masks):
+        """Dense uint8 multi-hot matrix back from bitmasks"""
+        masks = np.asarray(masks, dtype=np.int64)[:, None]
+        return ((masks >> np.arange(len(self.genre_to_id), dtype=np.int64)) & 1).astype(np.uint8)
+
+def _explode(genres):
+    """One row per (movie position, genre); accepts comma-joined strings or lists"""
+    genres = pd.Series(genres).reset_index(drop=True)
+    lists = genres.map(lambda value: value if isinstance(value, list) else split_list(value))
+    return lists.explode().dropna()
@@ -0,0 +1,95 @@
+import argparse
+import os
+import pandas as pd
+
+# Comma-joined TSV columns stored as native list<string> columns
+LIST_COLUMNS = ('actors', 'directors', 'writers', 'genres')
+
+# Column types applied when converting; anything else keeps pandas' inferred type
+DTYPES = {
+    'tconst': 'string',
+    'primaryTitle': 'string',
+    'startYear': 'Int64',
+    'original_language': 'category',
+    'distributor': 'category',
+    'mpaa': 'category',
+}
+
+def parquet_path(path):
+    """movies.tsv -> movies.parquet"""
+    return os.path.splitext(path)[0] + '.parquet'
+
+def split_list(value):
+    """'a,b,c' -> ['a', 'b', 'c']; missing values become an empty list"""
+    if isinstance(value, str) and value:
+        return value.split(',')
+    return []
+
+def fill_missing_lists(df, value='nan'):
+    """Turn empty list cells into [value], the ['nan'] that str(x).split(',') gave missing cells"""
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = [items if items else [value] for items in df[column]]
+    return df
+
+def read_tsv(path, columns=None):
+    """Read a movie TSV the old way, with list columns split and known columns typed"""
+    df = pd.read_csv(path, sep='\t', usecols=columns,
+                     dtype={k: v for k, v in DTYPES.items() if k != 'startYear'})
+    if 'startYear' in df.columns:
+        df['startYear'] = pd.to_numeric(df['startYear'], errors='coerce').astype(DTYPES['startYear'])
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = [split_list(value) for value in df[column]]
+    return df
+
+def write_parquet(df, path):
+    """Write a movie table with list columns typed as list<string>"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    list_columns = [column for column in LIST_COLUMNS if column in df.columns]
+    table = pa.Table.from_pandas(df.drop(columns=list_columns), preserve_index=False)
+    for column in list_columns:
+        table = table.append_column(column, pa.array(df[column], type=pa.list_(pa.string())))
+    pq.write_table(table, path, compression='zstd')
+
+def convert(tsv_path, path=None):
+    """Convert a movie TSV to Parquet next to it (or at `path`)"""
+    path = path or parquet_path(tsv_path)
+    write_parquet(read_tsv(tsv_path), path)
+    return path
+
+def read_movies(path, columns=None):
+    """Read only `columns` of a movie table; list columns come back as Python lists.
+
+    `path` may name the .tsv or the .parquet file. The Parquet copy is used when it
+    exists and is not older than the TSV; otherwise the TSV is parsed.
+    """
+    tsv_path = path if not path.endswith('.parquet') else None
+    path = parquet_path(path)
+    if not os.path.exists(path) or (tsv_path and os.path.exists(tsv_path) and os.path.getmtime(path) < os.path.getmtime(tsv_path)):
+        if tsv_path is None:
+            raise FileNotFoundError(path)
+        return read_tsv(tsv_path, columns)
+
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path, columns=columns)
+    list_columns = [column for column in LIST_COLUMNS if column in table.column_names]
+    df = table.drop(list_columns).to_pandas()
+    for column in list_columns:
+        df[column] = table.column(column).to_pylist()
+    # Keep the requested column order
+    return df[table.column_names]
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert movie TSVs to Parquet with typed and list columns")
+    parser.add_argument('files', nargs='+')
+    args = parser.parse_args()
+
+    for tsv_path in args.files:
+        print(f"{tsv_path} -> {convert(tsv_path)}")
+
+if __name__ == "__main__":
+    main()
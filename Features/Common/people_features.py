@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from movie_store import split_list
+
+# Output column names used by the Actors/Directors/Writers notebooks, and how each role aggregates its people
+ROLES = {
+    'actors': {
+        'agg': 'mean',
+        'columns': {
+            'nb_movies': 'actors_avg_nb_movies',
+            'tenure': 'actors_avg_tenure',
+            'total_gross': 'actors_avg_total_gross',
+            'total_profit': 'actors_avg_total_profit',
+            'avg_gross': 'actors_avg_avg_gross',
+            'avg_profit': 'actors_avg_avg_profit',
+        },
+    },
+    'directors': {
+        'agg': 'max',
+        'columns': {
+            'nb_movies': 'director_max_nb_movies',
+            'tenure': 'directors_max_tenure',
+            'total_gross': 'director_max_total_gross',
+            'total_profit': 'director_max_total_profit',
+            'avg_gross': 'director_max_avg_gross',
+            'avg_profit': 'director_max_avg_profit',
+        },
+    },
+    'writers': {
+        'agg': 'max',
+        'columns': {
+            'nb_movies': 'writer_max_nb_movies',
+            'tenure': 'writer_max_tenure',
+            'total_gross': 'writer_max_total_gross',
+            'total_profit': 'writer_max_total_profit',
+            'avg_gross': 'writer_max_avg_gross',
+            'avg_profit': 'writer_max_avg_profit',
+        },
+    },
+}
+
+BASE_COLUMNS = ['base_year', 'base_num_movies', 'base_total_gross', 'base_total_profit',
+                'base_nbmovies_revenue', 'base_nbmovies_profit']
+
+def people_lists(series, top_k=None):
+    """Role column as lists (comma-joined strings are split), cut to the first top_k people"""
+    lists = series.map(lambda value: value if isinstance(value, list) else split_list(value))
+    return lists.str[:top_k] if top_k else lists
+
+def base_stats(history, role, top_k=None):
+    """Career totals per person over the movies before the feature period (the notebooks' base.tsv)"""
+    people = history[['tconst', 'startYear', 'worldwide', 'profit']].copy()
+    people['nconst'] = people_lists(history[role], top_k)
+    people = people.explode('nconst').dropna(subset=['nconst'])
+
+    people['has_revenue'] = people['worldwide'] != 0
+    people['has_profit'] = ~people['profit'].isna()
+    summary = people.groupby('nconst').agg(
+        base_total_gross=('worldwide', 'sum'),
+        base_year=('startYear', 'min'),
+        base_num_movies=('tconst', 'nunique'),
+        base_total_profit=('profit', 'sum'),
+        base_nbmovies_revenue=('has_revenue', 'sum'),
+        base_nbmovies_profit=('has_profit', 'sum'),
+    ).reset_index()
+    return summary[['nconst'] + BASE_COLUMNS]
+
+def career_features(movies, base, role, top_k=None, agg=None, columns=None):
+    """As-of-release career stats of each movie's people, in movies' row order.
+
+    Every person starts from their `base` totals and accumulates worldwide gross
+    and profit (when the budget is known) over the movies in release order; a movie
+    only sees the films released before it. Per movie the people's stats are
+    averaged over top_k ('mean', as for actors) or maximized ('max', as for
+    directors and writers). Same results as the per-row loops in the notebooks.
+    """
+    agg = agg or ROLES[role]['agg']
+    columns = columns or ROLES[role]['columns']
+
+    people = pd.DataFrame({
+        'movie': np.arange(len(movies)),
+        'person': people_lists(movies[role], top_k).to_numpy(),
+        'startYear': movies['startYear'].to_numpy(dtype=float),
+        'worldwide': movies['worldwide'].fillna(0).to_numpy(dtype=float),
+        'budget': movies['budget'].to_numpy(dtype=float),
+    })
+    people = people.iloc[movies['release_date'].reset_index(drop=True).sort_values(kind='stable').index]
+    people = people.explode('person').dropna(subset=['person']).reset_index(drop=True)
+
+    people['has_profit'] = ~np.isnan(people['budget'])
+    people['profit'] = np.where(people['has_profit'], people['worldwide'] - people['budget'], 0.0)
+
+    # Cumulative sums minus the current film give the totals just before each release
+    grouped = people.groupby('person', sort=False)
+    prior_movies = grouped.cumcount().to_numpy()
+    prior_gross = grouped['worldwide'].cumsum().to_numpy() - people['worldwide'].to_numpy()
+    prior_profit = grouped['profit'].cumsum().to_numpy() - people['profit'].to_numpy()
+    prior_nb_profit = grouped['has_profit'].cumsum().to_numpy() - people['has_profit'].to_numpy()
+    first_year = grouped['startYear'].transform('first').to_numpy()
+
+    known = base.set_index('nconst')[BASE_COLUMNS].reindex(people['person'].to_numpy())
+    base_year = known['base_year'].fillna(-1).to_numpy(dtype=float)
+    base_year = np.where(base_year == -1, first_year, base_year)
+    nb_movies = known['base_num_movies'].fillna(0).to_numpy(dtype=float) + prior_movies
+    # Every processed film counts as a film with revenue, as in the original loop
+    nb_revenue = known['base_nbmovies_revenue'].fillna(0).to_numpy(dtype=float) + prior_movies
+    nb_profit = known['base_nbmovies_profit'].fillna(0).to_numpy(dtype=float) + prior_nb_profit
+    total_gross = known['base_total_gross'].fillna(0).to_numpy(dtype=float) + prior_gross
+    total_profit = known['base_total_profit'].fillna(0).to_numpy(dtype=float) + prior_profit
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats = pd.DataFrame({
+            'movie': people['movie'].to_numpy(),
+            'nb_movies': nb_movies,
+            'tenure': people['startYear'].to_numpy() - base_year,
+            'total_gross': np.where(nb_revenue != 0, total_gross, np.nan),
+            'avg_gross': np.where(nb_revenue != 0, total_gross / nb_revenue, np.nan),
+            'total_profit': np.where(nb_profit != 0, total_profit, np.nan),
+            'avg_profit': np.where(nb_profit != 0, total_profit / nb_profit, np.nan),
+        })
+
+    per_movie = stats.groupby('movie')
+    if agg == 'mean':
+        divisor = top_k if top_k else per_movie.size()
+        result = per_movie[['nb_movies', 'tenure', 'total_gross', 'avg_gross']].sum().div(divisor, axis=0)
+        profits = per_movie[['total_profit', 'avg_profit']].sum(min_count=1).div(divisor, axis=0)
+    elif agg == 'max':
+        result = per_movie[['nb_movies', 'tenure', 'total_gross', 'avg_gross']].max().fillna(0).clip(lower=0)
+        profits = per_movie[['total_profit', 'avg_profit']].max()
+    else:
+        raise ValueError(f"Unknown aggregation: {agg}")
+
+    # Movies without people keep the notebooks' defaults: zeros and missing profit
+    result = result.join(profits).reindex(np.arange(len(movies)))
+    result[['nb_movies', 'tenure', 'total_gross', 'avg_gross']] = result[['nb_movies', 'tenure', 'total_gross', 'avg_gross']].fillna(0)
+    result.index = movies.index
+    return result[list(columns)].rename(columns=columns)
@@ -0,0 +1,49 @@
+import json
+
+from batch_classifier import BatchClassifier, FakeBackend, MultiLabelClassifier, parse_multi_response, parse_response
+
+class FixedBackend:
+    """Replies with the same text to every prompt"""
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def complete(self, prompt):
+        self.calls += 1
+        return self.text
+
+def test_malformed_entries_only_drop_themselves():
+    text = json.dumps({"results": [
+        {"id": 0, "label": "yes"},
+        {"label": "NO"},
+        {"id": "two", "label": "NO"},
+        {"id": None, "label": "NO"},
+        "UNKNOWN",
+        {"id": "3", "label": "maybe"},
+        {"id": "4", "label": "UNKNOWN"},
+    ]})
+    assert parse_response(text) == {0: "YES", 4: "UNKNOWN"}
+
+def test_multi_label_malformed_entries():
+    text = "```json\n" + json.dumps({"results": [
+        {"id": 0, "Sequel": "YES", "Adaptation": "NO"},
+        {"id": [1], "Sequel": "NO", "Adaptation": "NO"},
+        {"id": 2, "Sequel": "NO"},
+    ]}) + "\n```"
+    assert parse_multi_response(text, ["Sequel", "Adaptation"]) == {0: {"Sequel": "YES", "Adaptation": "NO"}}
+
+def test_partial_batch_is_kept_without_retrying():
+    backend = FixedBackend(json.dumps({"results": [{"id": 1, "label": "NO"}, {"id": "x", "label": "YES"}]}))
+    classifier = BatchClassifier(backend, requests_per_minute=60000)
+    assert classifier.classify_batch(["A (2001)", "B (2002)", "C (2003)"]) == [None, "NO", None]
+    assert backend.calls == 1
+
+def test_fake_backend_batches():
+    backend = FakeBackend(lambda title: {"Sequel": "YES" if "2" in title else "NO"})
+    classifier = MultiLabelClassifier(backend, ["Sequel"], batch_size=2, requests_per_minute=60000)
+    titles = ["Alien (1979)", "Aliens 2 (1986)", "Heat (1995)"]
+    assert list(classifier.classify(titles)) == [
+        (0, [{"Sequel": "NO"}, {"Sequel": "YES"}]),
+        (2, [{"Sequel": "NO"}]),
+    ]
+    assert backend.calls == 2
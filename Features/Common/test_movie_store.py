@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from movie_store import convert, fill_missing_lists, read_movies
+
+COLUMNS = ['tconst', 'actors', 'directors']
+
+@pytest.fixture
+def tsv_path(tmp_path):
+    path = str(tmp_path / 'movies.tsv')
+    pd.DataFrame({
+        'tconst': ['tt1', 'tt2', 'tt3', 'tt4'],
+        'actors': ['a,b', None, 'c', 'a,,d'],
+        'directors': ['x', 'y', None, None],
+    }).to_csv(path, sep='\t', index=False)
+    return path
+
+def original_parse(path):
+    """How the network scripts parsed the TSV before movie_store"""
+    df = pd.read_csv(path, sep='\t')[COLUMNS]
+    for column in ('actors', 'directors'):
+        df[column] = df[column].apply(lambda x: str(x).split(','))
+    return df
+
+def test_tsv_keeps_the_nan_sentinel(tsv_path):
+    df = fill_missing_lists(read_movies(tsv_path, columns=COLUMNS))
+    expected = original_parse(tsv_path)
+    for column in ('actors', 'directors'):
+        assert df[column].tolist() == expected[column].tolist()
+
+def test_parquet_keeps_the_nan_sentinel(tsv_path):
+    pytest.importorskip('pyarrow')
+    convert(tsv_path)
+    df = fill_missing_lists(read_movies(tsv_path, columns=COLUMNS))
+    expected = original_parse(tsv_path)
+    for column in ('actors', 'directors'):
+        assert df[column].tolist() == expected[column].tolist()
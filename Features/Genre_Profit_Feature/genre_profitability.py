@@ -0,0 +1,55 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from genre_encoder import GenreEncoder
+
+def normalize_rows(matrix):
+    """Unit-length float rows of a multi-hot matrix, so dot products are cosine similarities"""
+    norms = np.sqrt(np.asarray(matrix.sum(axis=1), dtype=float).ravel())
+    with np.errstate(divide='ignore'):
+        scale = np.where(norms > 0, 1 / norms, 0)
+    return sp.diags(scale) @ matrix.astype(float)
+
+def weighted_genre_profitability(mdf, omdf, first_year=2000, encoder=None):
+    """Sum over last year's movies of cosine(genres, their genres) * their profit.
+
+    Movies released up to `first_year` are compared with `omdf` (the 1999 movies),
+    later ones with the movies of mdf released the year before. Each year is one
+    (movies_y x 21) . (21 x movies_y-1) . profit product, evaluated right to left
+    so only a 21-vector per year is kept in memory.
+
+    NaNs propagate as in the original per-pair loop: a missing profit or a movie
+    without genres among the compared movies makes the whole year NaN, and a movie
+    without genres is NaN whenever it has movies to be compared with.
+    """
+    encoder = encoder or GenreEncoder.load()
+    matrix = encoder.transform(mdf['genres'])
+    vectors = normalize_rows(matrix).tocsr()
+    no_genres = matrix.getnnz(axis=1) == 0
+    years = mdf['startYear'].to_numpy()
+    profits = mdf['profit'].to_numpy(dtype=float)
+
+    reference_matrix = encoder.transform(omdf['genres'])
+    reference_profits = omdf['profit'].to_numpy(dtype=float)
+    reference_invalid = np.isnan(reference_profits) | (reference_matrix.getnnz(axis=1) == 0)
+    # Genre-space profit of the 1999 reference movies
+    reference = normalize_rows(reference_matrix).T @ np.where(reference_invalid, 0, reference_profits)
+
+    result = np.zeros(len(mdf))
+    for year in np.unique(years):
+        targets = years == year
+        if year <= first_year:
+            weights, compared, invalid = reference, len(omdf), reference_invalid.any()
+        else:
+            previous = years == year - 1
+            previous_invalid = np.isnan(profits[previous]) | no_genres[previous]
+            weights = vectors[previous].T @ np.where(previous_invalid, 0, profits[previous])
+            compared, invalid = previous.sum(), previous_invalid.any()
+        result[targets] = np.nan if invalid else vectors[targets] @ weights
+        if compared:
+            result[targets & no_genres] = np.nan
+    return pd.Series(result, index=mdf.index)
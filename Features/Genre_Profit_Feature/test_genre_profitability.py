@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from genre_profitability import weighted_genre_profitability, GenreEncoder
+
+def loop_genre_profitability(mdf, omdf, first_year=2000):
+    """The per-pair iterrows loop genre_profit_feat.ipynb used before it was vectorized"""
+    genre_to_id = GenreEncoder.load().genre_to_id
+
+    def vector(genres):
+        genres_vector = np.zeros(len(genre_to_id))
+        for genre in genres.split(',') if genres else []:
+            genres_vector[genre_to_id[genre]] = 1
+        return genres_vector
+
+    def cosine_similarity(vec1, vec2):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+
+    result = []
+    for _, row in mdf.iterrows():
+        others = omdf if row['startYear'] <= first_year else mdf[mdf['startYear'] == row['startYear'] - 1]
+        total = 0
+        for _, r in others.iterrows():
+            total += cosine_similarity(vector(row['genres']), vector(r['genres'])) * r['profit']
+        result.append(total)
+    return pd.Series(result, index=mdf.index, dtype=float)
+
+def check(mdf, omdf):
+    expected = loop_genre_profitability(mdf, omdf)
+    actual = weighted_genre_profitability(mdf, omdf)
+    pd.testing.assert_series_equal(actual, expected, check_exact=False, rtol=1e-9)
+
+def test_nan_profit_makes_the_next_year_nan():
+    mdf = pd.DataFrame({
+        'genres': ['Drama', 'Comedy', 'Drama', 'Comedy'],
+        'startYear': [2001, 2001, 2002, 2002],
+        'profit': [np.nan, 5, 1, 1],
+    })
+    omdf = pd.DataFrame({'genres': ['Drama'], 'profit': [3.0]})
+    check(mdf, omdf)
+    assert weighted_genre_profitability(mdf, omdf).iloc[2:].isna().all()
+
+def test_movies_without_genres():
+    mdf = pd.DataFrame({
+        'genres': ['Drama', '', 'Comedy,Drama', 'Action', '', 'Drama'],
+        'startYear': [2000, 2000, 2001, 2002, 2004, 2004],
+        'profit': [1.0, 2, 3, 4, 5, 6],
+    })
+    omdf = pd.DataFrame({'genres': ['Drama', 'Action,Comedy'], 'profit': [3.0, -2]})
+    check(mdf, omdf)
+
+def test_random_movies_with_missing_profits():
+    rng = np.random.default_rng(0)
+    genres = GenreEncoder.load().genres
+    def random_genres(n):
+        return [','.join(rng.choice(genres, size=rng.integers(1, 4), replace=False)) for _ in range(n)]
+
+    mdf = pd.DataFrame({
+        'genres': random_genres(300),
+        'startYear': rng.integers(1998, 2010, size=300),
+        'profit': rng.normal(size=300) * 1e6,
+    })
+    mdf.loc[mdf.sample(3, random_state=0).index, 'profit'] = np.nan
+    omdf = pd.DataFrame({'genres': random_genres(40), 'profit': rng.normal(size=40) * 1e6})
+    check(mdf, omdf)
@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from batch_classifier import AnswerCache, GeminiBackend, MultiLabelClassifier, format_title, multi_label_prompt, prompt_version
+
+# One pass over the titles answers every label; preprocess.ipynb maps these columns to 0/1
+DEFINITIONS = {
+    "Sequel": """
+    A sequel is a movie that continues or expands upon the events, characters, or storylines of a previous movie, though it doesn't necessarily have to follow the events chronologically. It may explore past, present, or future events of the same universe or involve the same characters in different circumstances.
+    Output YES if the movie is a sequel, NO if it is not, UNKNOWN if you're not sure.
+    """,
+    "Transmedia": """
+    Transmedia storytelling is a narrative technique in which a story is told across multiple platforms or media, with each medium offering a unique perspective and adding to the overall narrative. For example, a story might start as a movie, but then expand into books, games, comics, and other forms of media, with each medium contributing new and complementary parts of the storyline.
+    Output YES if the movie is part of a transmedia story, NO if it is not, UNKNOWN if you're not sure.
+    """,
+    "Adaptation": """
+    Movie Adaptation is the process of reimagining a story from another medium, like a book or game, into a movie. It translates the original narrative into a cinematic format, often making changes to suit the visual and time-bound nature of film.
+    Output YES if the movie is an adaptation, NO if it is not, UNKNOWN if you're not sure.
+    """,
+}
+
+system_prompt = multi_label_prompt(DEFINITIONS)
+
+def classify_movies(df, classifier, cache, fail_log):
+    """Label every row of df, asking the model only for (title, year) pairs not cached under the current prompt"""
+    keys = [(str(title), str(year)) for title, year in zip(df["primaryTitle"], df["startYear"])]
+    answers = cache.get_many(set(keys))
+    missing = sorted(set(keys) - set(answers))
+    print(f"{len(answers)} titles cached, {len(missing)} to classify")
+
+    failures = []
+    titles = [format_title(title, year) for title, year in missing]
+    with open(fail_log, "a", encoding="utf-8") as fail_file:
+        for start, labels in classifier.classify(titles):
+            batch = missing[start:start + len(labels)]
+            new_answers = {key: label for key, label in zip(batch, labels) if label is not None}
+            cache.put_many(new_answers)
+            answers.update(new_answers)
+            for key, label in zip(batch, labels):
+                if label is None:
+                    failures.append(key)
+                    fail_file.write(f"{key[0]}\t{key[1]}\n")
+            fail_file.flush()
+            print(f"Processed {start + len(labels)}/{len(titles)}")
+
+    result = df[["tconst", "primaryTitle", "startYear"]].copy()
+    for task in classifier.tasks:
+        result[task] = [answers[key][task] if key in answers else None for key in keys]
+    return result, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Label movies as Sequel, Transmedia and Adaptation in a single pass")
+    parser.add_argument('--input', default="final_movies_3_bf.tsv")
+    parser.add_argument('--output', default="movie_labels.tsv")
+    parser.add_argument('--cache', default="label_cache.sqlite")
+    parser.add_argument('--fail-log', default="failed_labels.txt")
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--requests-per-minute', type=float, default=10)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input, delimiter="\t", encoding="utf-8")
+
+    backend = GeminiBackend(system_prompt, api_key=os.environ.get("GEMINI_API_KEY", ""))
+    classifier = MultiLabelClassifier(backend, DEFINITIONS, batch_size=args.batch_size,
+                                      requests_per_minute=args.requests_per_minute)
+    cache = AnswerCache(args.cache, prompt_version(system_prompt))
+    result, failures = classify_movies(df, classifier, cache, args.fail_log)
+    cache.close()
+
+    result.to_csv(args.output, sep="\t", index=False)
+    if failures:
+        print(f"Failed to classify {len(failures)} titles, logged in {args.fail_log}")
+    print(f"Labels for {len(result)} movies saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
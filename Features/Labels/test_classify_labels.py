@@ -0,0 +1,44 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from batch_classifier import AnswerCache, FakeBackend, MultiLabelClassifier
+from classify_labels import classify_movies
+
+TASKS = ["Sequel", "Transmedia", "Adaptation"]
+
+def label_title(title):
+    return {task: "YES" if title.startswith("Alien") else "NO" for task in TASKS}
+
+def test_cached_titles_are_not_asked_again(tmp_path):
+    df = pd.DataFrame({
+        "tconst": ["tt1", "tt2", "tt3"],
+        "primaryTitle": ["Alien", "Heat", "Alien"],
+        "startYear": [1979, 1995, 1979],
+    })
+    cache_path, fail_log = str(tmp_path / "cache.sqlite"), str(tmp_path / "failed.txt")
+
+    backend = FakeBackend(label_title)
+    classifier = MultiLabelClassifier(backend, TASKS, requests_per_minute=60000)
+    cache = AnswerCache(cache_path, "v1")
+    result, failures = classify_movies(df, classifier, cache, fail_log)
+    cache.close()
+    assert backend.calls == 1
+    assert failures == []
+    assert result["Sequel"].tolist() == ["YES", "NO", "YES"]
+
+    # Same prompt version: every title comes from the cache
+    backend = FakeBackend(label_title)
+    cache = AnswerCache(cache_path, "v1")
+    cached, failures = classify_movies(df, MultiLabelClassifier(backend, TASKS, requests_per_minute=60000), cache, fail_log)
+    cache.close()
+    assert backend.calls == 0
+    pd.testing.assert_frame_equal(cached, result)
+
+    # A new prompt version asks again
+    backend = FakeBackend(label_title)
+    cache = AnswerCache(cache_path, "v2")
+    classify_movies(df, MultiLabelClassifier(backend, TASKS, requests_per_minute=60000), cache, fail_log)
+    cache.close()
+    assert backend.calls == 1
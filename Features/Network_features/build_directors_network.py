@@ -1,8 +1,13 @@
 import numpy as np
 import pandas as pd
-from collections import defaultdict
+import scipy.sparse as sp
 import os
-from datetime import datetime
+import sys
+
+from node_index import NodeIndex
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from movie_store import fill_missing_lists, read_movies
 
 class ActorDirectorCollaborationNetwork:
     def __init__(self):
@@ -11,9 +16,24 @@ class ActorDirectorCollaborationNetwork:
         self.director_to_idx = {}  # Maps director IDs to indices
         self.idx_to_actor = {}  # Maps indices to actor names
         self.idx_to_director = {}  # Maps indices to director IDs
-        self.adj_matrix = None  # Adjacency matrix (actors x directors)
         self.next_actor_idx = 0  # Next index for actors
         self.next_director_idx = 0  # Next index for directors
+        # (actor, director) edge buffer (COO), grown by doubling and merged into CSR on freeze
+        self._rows = np.empty(1024, dtype=np.int32)
+        self._cols = np.empty(1024, dtype=np.int32)
+        self._n_buffered = 0
+        self._frozen = sp.csr_matrix((0, 0), dtype=np.int32)
+    
+    @property
+    def adj_matrix(self):
+        """Sparse adjacency matrix (CSR, actors x directors)"""
+        self.freeze()
+        return self._frozen
+    
+    @adj_matrix.setter
+    def adj_matrix(self, matrix):
+        self._frozen = sp.csr_matrix(matrix, dtype=np.int32)
+        self._n_buffered = 0
     
     def add_actor(self, actor):
         """Add a new actor to the network if not exists"""
@@ -21,17 +41,6 @@ class ActorDirectorCollaborationNetwork:
             self.actor_to_idx[actor] = self.next_actor_idx
             self.idx_to_actor[self.next_actor_idx] = actor
             self.next_actor_idx += 1
-            
-            # Resize adjacency matrix if necessary
-            if self.adj_matrix is not None:
-                new_rows = self.next_actor_idx
-                new_cols = self.next_director_idx
-                new_matrix = np.zeros((new_rows, new_cols), dtype=int)
-                if self.adj_matrix.size > 0:
-                    new_matrix[:-1, :] = self.adj_matrix
-                self.adj_matrix = new_matrix
-            else:
-                self.adj_matrix = np.zeros((1, 1), dtype=int)
     
     def add_director(self, director):
         """Add a new director to the network if not exists"""
@@ -39,17 +48,48 @@ class ActorDirectorCollaborationNetwork:
             self.director_to_idx[director] = self.next_director_idx
             self.idx_to_director[self.next_director_idx] = director
             self.next_director_idx += 1
-            
-            # Resize adjacency matrix if necessary
-            if self.adj_matrix is not None:
-                new_rows = self.next_actor_idx
-                new_cols = self.next_director_idx
-                new_matrix = np.zeros((new_rows, new_cols), dtype=int)
-                if self.adj_matrix.size > 0:
-                    new_matrix[:, :-1] = self.adj_matrix
-                self.adj_matrix = new_matrix
-            else:
-                self.adj_matrix = np.zeros((1, 1), dtype=int)
+    
+    def _buffer_edges(self, rows, cols):
+        """Append edges to the COO buffer, doubling its capacity when full"""
+        needed = self._n_buffered + len(rows)
+        if needed > len(self._rows):
+            capacity = max(needed, 2 * len(self._rows))
+            self._rows = np.resize(self._rows, capacity)
+            self._cols = np.resize(self._cols, capacity)
+        self._rows[self._n_buffered:needed] = rows
+        self._cols[self._n_buffered:needed] = cols
+        self._n_buffered = needed
+    
+    def freeze(self):
+        """Merge buffered edges into the CSR matrix"""
+        shape = (self.next_actor_idx, self.next_director_idx)
+        if self._n_buffered == 0 and self._frozen.shape == shape:
+            return self._frozen
+        
+        rows = self._rows[:self._n_buffered]
+        cols = self._cols[:self._n_buffered]
+        delta = sp.coo_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+        
+        frozen = self._frozen.tocoo()
+        frozen = sp.csr_matrix((frozen.data, (frozen.row, frozen.col)), shape=shape)
+        
+        self._frozen = (frozen + delta).tocsr()
+        self._n_buffered = 0
+        return self._frozen
+    
+    def to_sparse(self, fmt='csr'):
+        """Export the adjacency matrix as a scipy.sparse matrix"""
+        return self.adj_matrix.asformat(fmt)
+    
+    def actor_projection(self):
+        """Actor x actor matrix of shared-director counts (A @ A.T)"""
+        adj_matrix = self.adj_matrix
+        return (adj_matrix @ adj_matrix.T).tocsr()
+    
+    def director_projection(self):
+        """Director x director matrix of shared-actor counts (A.T @ A)"""
+        adj_matrix = self.adj_matrix.tocsc()
+        return (adj_matrix.T @ adj_matrix).tocsr()
     
     def add_collaboration(self, actor, director):
         """Add or increment collaboration between an actor and a director"""
@@ -59,55 +99,90 @@ class ActorDirectorCollaborationNetwork:
         actor_idx = self.actor_to_idx[actor]
         director_idx = self.director_to_idx[director]
         
-        self.adj_matrix[actor_idx, director_idx] += 1
+        self._buffer_edges([actor_idx], [director_idx])
     
     def process_movie(self, actors, directors):
         """Process all actor-director collaborations in a movie"""
         if not isinstance(actors, list) or not isinstance(directors, list):
             print('Actors or directors are not in a list')
             return
-            
+        
+        actor_indices = []
         for actor in actors:
             actor = str(actor).strip()
-            for director in directors:
-                director = str(director).strip()
-                self.add_collaboration(actor, director)
-    
-    # def get_metrics(self):
-    #     """Calculate network metrics"""
-    #     n_actors = len(self.actor_to_idx)
-    #     n_directors = len(self.director_to_idx)
-        
-    #     if n_actors == 0 or n_directors == 0:
-    #         return {
-    #             'num_actors': n_actors,
-    #             'num_directors': n_directors,
-    #             'num_collaborations': 0,
-    #             'density': 0
-    #         }
-        
-    #     # Number of collaborations (non-zero entries in the adjacency matrix)
-    #     num_collaborations = np.sum(self.adj_matrix > 0)
-        
-    #     # Density (actual collaborations / possible collaborations)
-    #     density = num_collaborations / (n_actors * n_directors) if (n_actors * n_directors) > 0 else 0
-        
-    #     return {
-    #         'num_actors': n_actors,
-    #         'num_directors': n_directors,
-    #         'num_collaborations': num_collaborations,
-    #         'density': density
-    #     }
+            self.add_actor(actor)
+            actor_indices.append(self.actor_to_idx[actor])
+        
+        director_indices = []
+        for director in directors:
+            director = str(director).strip()
+            self.add_director(director)
+            director_indices.append(self.director_to_idx[director])
+        
+        rows, cols = np.meshgrid(actor_indices, director_indices, indexing='ij')
+        self._buffer_edges(rows.ravel(), cols.ravel())
+    
+    def process_movies(self, actors, directors):
+        """Process all collaborations of a column of movies in one vectorized pass"""
+        actors = pd.Series(actors).reset_index(drop=True)
+        directors = pd.Series(directors).reset_index(drop=True)
+        is_list = actors.map(lambda x: isinstance(x, list)) & directors.map(lambda x: isinstance(x, list))
+        if not is_list.all():
+            print(f'{int((~is_list).sum())} movies skipped: actors or directors are not in a list')
+            actors, directors = actors[is_list], directors[is_list]
+        
+        pairs = pd.merge(
+            actors.explode().dropna().astype(str).str.strip().rename('actor').rename_axis('movie').reset_index(),
+            directors.explode().dropna().astype(str).str.strip().rename('director').rename_axis('movie').reset_index(),
+            on='movie'
+        )
+        if pairs.empty:
+            return
+        
+        codes, uniques = pd.factorize(pairs['actor'])
+        for actor in uniques:
+            self.add_actor(actor)
+        rows = np.fromiter((self.actor_to_idx[a] for a in uniques), dtype=np.int32, count=len(uniques))[codes]
+        
+        codes, uniques = pd.factorize(pairs['director'])
+        for director in uniques:
+            self.add_director(director)
+        cols = np.fromiter((self.director_to_idx[d] for d in uniques), dtype=np.int32, count=len(uniques))[codes]
+        
+        self._buffer_edges(rows, cols)
+    
+    def get_metrics(self):
+        """Calculate network metrics"""
+        n_actors = len(self.actor_to_idx)
+        n_directors = len(self.director_to_idx)
+        
+        if n_actors == 0 or n_directors == 0:
+            return {
+                'num_actors': n_actors,
+                'num_directors': n_directors,
+                'num_collaborations': 0,
+                'density': 0
+            }
+        
+        # Number of collaborations (non-zero entries in the adjacency matrix)
+        num_collaborations = self.adj_matrix.nnz
+        
+        # Density (actual collaborations / possible collaborations)
+        density = num_collaborations / (n_actors * n_directors)
+        
+        return {
+            'num_actors': n_actors,
+            'num_directors': n_directors,
+            'num_collaborations': num_collaborations,
+            'density': density
+        }
 
 def load_and_preprocess_data(base_file_path, snapshot_file_path):
     """Load and preprocess the datasets"""
-    base_df = pd.read_csv(base_file_path, sep='\t')
-    base_df['actors'] = base_df['actors'].apply(lambda x: str(x).split(','))
-    base_df['directors'] = base_df['directors'].apply(lambda x: str(x).split(','))
+    # Missing people stay ['nan'] as in the original TSV parsing, so the networks keep that node
+    base_df = fill_missing_lists(read_movies(base_file_path, columns=['actors', 'directors']))
     
-    snapshot_df = pd.read_csv(snapshot_file_path, sep='\t')
-    snapshot_df['actors'] = snapshot_df['actors'].apply(lambda x: str(x).split(','))
-    snapshot_df['directors'] = snapshot_df['directors'].apply(lambda x: str(x).split(','))
+    snapshot_df = fill_missing_lists(read_movies(snapshot_file_path, columns=['release_date', 'actors', 'directors']))
     snapshot_df['year'] = pd.to_datetime(snapshot_df['release_date']).dt.year
     
     print(f"Base dataset: {len(base_df)} movies")
@@ -119,38 +194,46 @@ def save_network(network, filename):
     """Save network to files"""
     os.makedirs('network_data_directors', exist_ok=True)
     
-    np.save(f'network_data_directors/{filename}_adj.npy', network.adj_matrix)
+    sp.save_npz(f'network_data_directors/{filename}_adj.npz', network.to_sparse())
     
-    mappings = {
-        'actor_to_idx': network.actor_to_idx,
-        'director_to_idx': network.director_to_idx,
-        'idx_to_actor': network.idx_to_actor,
-        'idx_to_director': network.idx_to_director
-    }
-    np.save(f'network_data_directors/{filename}_mappings.npy', mappings)
+    # Indices are append-only, so one shared table per axis covers every saved network
+    NodeIndex.from_mapping(network.idx_to_actor, network.next_actor_idx).save('network_data_directors', 'actors')
+    NodeIndex.from_mapping(network.idx_to_director, network.next_director_idx).save('network_data_directors', 'directors')
 
 def load_network(filename):
     """Load network from files"""
     network = ActorDirectorCollaborationNetwork()
     
-    network.adj_matrix = np.load(f'network_data_directors/{filename}_adj.npy')
+    if os.path.exists(f'network_data_directors/{filename}_adj.npz'):
+        adj_matrix = sp.load_npz(f'network_data_directors/{filename}_adj.npz')
+    else:
+        # Networks saved before the sparse format stored a dense matrix
+        adj_matrix = np.load(f'network_data_directors/{filename}_adj.npy')
     
-    mappings = np.load(f'network_data_directors/{filename}_mappings.npy', allow_pickle=True).item()
-    network.actor_to_idx = mappings['actor_to_idx']
-    network.director_to_idx = mappings['director_to_idx']
-    network.idx_to_actor = mappings['idx_to_actor']
-    network.idx_to_director = mappings['idx_to_director']
+    if os.path.exists(f'network_data_directors/{filename}_mappings.npy'):
+        # Networks saved before the shared node tables pickled their mapping dicts
+        mappings = np.load(f'network_data_directors/{filename}_mappings.npy', allow_pickle=True).item()
+        network.actor_to_idx = mappings['actor_to_idx']
+        network.director_to_idx = mappings['director_to_idx']
+        network.idx_to_actor = mappings['idx_to_actor']
+        network.idx_to_director = mappings['idx_to_director']
+    else:
+        n_actors, n_directors = adj_matrix.shape
+        actors = NodeIndex.load('network_data_directors', 'actors', count=n_actors)
+        directors = NodeIndex.load('network_data_directors', 'directors', count=n_directors)
+        network.actor_to_idx, network.idx_to_actor = actors.to_dicts()
+        network.director_to_idx, network.idx_to_director = directors.to_dicts()
     network.next_actor_idx = len(network.actor_to_idx)
     network.next_director_idx = len(network.director_to_idx)
     
+    network.adj_matrix = adj_matrix
     return network
 
 def build_base_network(df):
     """Build initial actor-director collaboration network"""
     network = ActorDirectorCollaborationNetwork()
-    
-    for _, row in df.iterrows():
-        network.process_movie(row['actors'], row['directors'])
+    network.process_movies(df['actors'], df['directors'])
+    network.freeze()
     
     return network
 
@@ -174,8 +257,7 @@ def build_snapshot_networks(base_network, snapshot_df, start_year=2000, end_year
         print(f"\nProcessing year {year}")
         print(f"Number of movies in {year}: {len(year_data)}")
         
-        for _, row in year_data.iterrows():
-            current_network.process_movie(row['actors'], row['directors'])
+        current_network.process_movies(year_data['actors'], year_data['directors'])
         
         snapshots[year] = ActorDirectorCollaborationNetwork()
         snapshots[year].actor_to_idx = current_network.actor_to_idx.copy()
@@ -188,11 +270,11 @@ def build_snapshot_networks(base_network, snapshot_df, start_year=2000, end_year
         
         save_network(snapshots[year], f'snapshot_{year}')
         
-        # metrics = snapshots[year].get_metrics()
-        # print(f"Year {year} statistics:")
-        # print(f"Actors = {metrics['num_actors']}")
-        # print(f"Directors = {metrics['num_directors']}")
-        # print(f"Collaborations = {metrics['num_collaborations']}")
+        metrics = snapshots[year].get_metrics()
+        print(f"Year {year} statistics:")
+        print(f"Actors = {metrics['num_actors']}")
+        print(f"Directors = {metrics['num_directors']}")
+        print(f"Collaborations = {metrics['num_collaborations']}")
         
     return snapshots
 
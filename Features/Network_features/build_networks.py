@@ -1,17 +1,77 @@
 import numpy as np
 import pandas as pd
-from ast import literal_eval
-from collections import defaultdict
+import scipy.sparse as sp
 import os
-from datetime import datetime
+import sys
+
+from node_index import NodeIndex
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from movie_store import fill_missing_lists, read_movies
 
 class CollaborationNetwork:
     def __init__(self):
         """Initialize empty network"""
-        self.actor_to_idx = {}  
-        self.idx_to_actor = {}  
-        self.adj_matrix = None  
+        self._actor_to_idx = {}  
+        self._idx_to_actor = {}  
+        self._node_index = None  # Loaded networks keep nodes in a NodeIndex until dicts are needed
         self.next_idx = 0       
+        # Upper-triangle edge buffer (COO), grown by doubling and merged into CSR on freeze
+        self._rows = np.empty(1024, dtype=np.int32)
+        self._cols = np.empty(1024, dtype=np.int32)
+        self._n_buffered = 0
+        self._frozen = sp.csr_matrix((0, 0), dtype=np.int32)
+    
+    @property
+    def actor_to_idx(self):
+        if self._actor_to_idx is None:
+            self._actor_to_idx, self._idx_to_actor = self._node_index.to_dicts()
+        return self._actor_to_idx
+
+    @actor_to_idx.setter
+    def actor_to_idx(self, mapping):
+        self._actor_to_idx = mapping
+        self._node_index = None
+
+    @property
+    def idx_to_actor(self):
+        if self._idx_to_actor is None:
+            self._actor_to_idx, self._idx_to_actor = self._node_index.to_dicts()
+        return self._idx_to_actor
+
+    @idx_to_actor.setter
+    def idx_to_actor(self, mapping):
+        self._idx_to_actor = mapping
+        self._node_index = None
+
+    @property
+    def node_index(self):
+        """Columnar NodeIndex of the current nodes"""
+        if self._node_index is None or len(self._node_index) != self.next_idx:
+            self._node_index = NodeIndex.from_mapping(self.idx_to_actor, self.next_idx)
+        return self._node_index
+
+    @node_index.setter
+    def node_index(self, node_index):
+        self._node_index = node_index
+        self._actor_to_idx = None
+        self._idx_to_actor = None
+        self.next_idx = len(node_index)
+
+    def lookup(self, actors):
+        """Vectorized actor -> index lookup, -1 for unknown actors"""
+        return self.node_index.lookup(actors)
+
+    @property
+    def adj_matrix(self):
+        """Symmetric sparse adjacency matrix (CSR) of the current network"""
+        self.freeze()
+        return self._frozen
+
+    @adj_matrix.setter
+    def adj_matrix(self, matrix):
+        self._frozen = sp.csr_matrix(matrix, dtype=np.int32)
+        self._n_buffered = 0
     
     def add_actor(self, actor):
         """Add new actor to the network if not exists"""
@@ -19,15 +79,39 @@ class CollaborationNetwork:
             self.actor_to_idx[actor] = self.next_idx
             self.idx_to_actor[self.next_idx] = actor
             self.next_idx += 1
-            
-            if self.adj_matrix is not None:
-                new_size = len(self.actor_to_idx)
-                new_matrix = np.zeros((new_size, new_size), dtype=int)
-                if self.adj_matrix.size > 0:
-                    new_matrix[:-1, :-1] = self.adj_matrix
-                self.adj_matrix = new_matrix
-            else:
-                self.adj_matrix = np.zeros((1, 1), dtype=int)
+    
+    def _buffer_edges(self, rows, cols):
+        """Append edges to the COO buffer, doubling its capacity when full"""
+        needed = self._n_buffered + len(rows)
+        if needed > len(self._rows):
+            capacity = max(needed, 2 * len(self._rows))
+            self._rows = np.resize(self._rows, capacity)
+            self._cols = np.resize(self._cols, capacity)
+        self._rows[self._n_buffered:needed] = rows
+        self._cols[self._n_buffered:needed] = cols
+        self._n_buffered = needed
+    
+    def buffered_delta(self):
+        """Symmetric CSR matrix of the edges added since the last freeze"""
+        n = self.next_idx
+        rows = self._rows[:self._n_buffered]
+        cols = self._cols[:self._n_buffered]
+        upper = sp.coo_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(n, n)).tocsr()
+        return (upper + upper.T).tocsr()
+    
+    def freeze(self):
+        """Merge buffered edges into the CSR matrix"""
+        n = self.next_idx
+        if self._n_buffered == 0 and self._frozen.shape == (n, n):
+            return self._frozen
+        
+        self._frozen = (resize_adjacency(self._frozen, n) + self.buffered_delta()).tocsr()
+        self._n_buffered = 0
+        return self._frozen
+    
+    def to_sparse(self, fmt='csr'):
+        """Export the adjacency matrix as a scipy.sparse matrix"""
+        return self.adj_matrix.asformat(fmt)
     
     def add_collaboration(self, actor1, actor2):
         """Add or increment collaboration between two actors"""
@@ -37,56 +121,179 @@ class CollaborationNetwork:
         idx1 = self.actor_to_idx[actor1]
         idx2 = self.actor_to_idx[actor2]
         
-        self.adj_matrix[idx1, idx2] += 1
-        self.adj_matrix[idx2, idx1] += 1
+        self._buffer_edges([min(idx1, idx2)], [max(idx1, idx2)])
     
     def process_movie(self, actors):
         """Process all collaborations in a movie"""
         if not isinstance(actors, list):
             print('actors are not in a list')
             return
-            
-        for i in range(len(actors)):
-            for j in range(i + 1, len(actors)):
-                actor1 = str(actors[i]).strip()
-                actor2 = str(actors[j]).strip()
-                self.add_collaboration(actor1, actor2)
-    
-    # def get_metrics(self):
-    #     """Calculate network metrics"""
-    #     n_actors = len(self.actor_to_idx)
-    #     if n_actors == 0:
-    #         return {
-    #             'num_nodes': 0,
-    #             'num_edges': 0,
-    #             'avg_degree': 0,
-    #             'density': 0
-    #         }
-        
-    #     # Number of edges (sum of upper triangle since matrix is symmetric)
-    #     num_edges = np.sum(np.triu(self.adj_matrix > 0, k=1))
-        
-    #     # Average degree
-    #     degrees = np.sum(self.adj_matrix > 0, axis=1)
-    #     avg_degree = np.mean(degrees)
-        
-    #     # Density
-    #     density = (2 * num_edges) / (n_actors * (n_actors - 1)) if n_actors > 1 else 0
-        
-    #     return {
-    #         'num_nodes': n_actors,
-    #         'num_edges': num_edges,
-    #         'avg_degree': avg_degree,
-    #         'density': density
-    #     }
+        # Actors only become nodes through a collaboration, so a lone actor adds nothing
+        if len(actors) < 2:
+            return
+        
+        indices = []
+        for actor in actors:
+            actor = str(actor).strip()
+            self.add_actor(actor)
+            indices.append(self.actor_to_idx[actor])
+        
+        # All pairs i < j, same as the nested loop over positions
+        i, j = np.triu_indices(len(indices), k=1)
+        indices = np.asarray(indices, dtype=np.int32)
+        rows, cols = indices[i], indices[j]
+        self._buffer_edges(np.minimum(rows, cols), np.maximum(rows, cols))
+
+    def process_movies(self, actors):
+        """Process all collaborations of a column of movies in one vectorized pass"""
+        actors = pd.Series(actors).reset_index(drop=True)
+        is_list = actors.map(lambda x: isinstance(x, list))
+        if not is_list.all():
+            print(f'{int((~is_list).sum())} movies skipped: actors are not in a list')
+            actors = actors[is_list]
+
+        exploded = actors.explode().dropna().astype(str).str.strip()
+        # Actors only become nodes through a collaboration, as with process_movie
+        exploded = exploded[exploded.groupby(level=0).transform('size') > 1]
+        if exploded.empty:
+            return
+
+        # Factorize in order of first appearance so ids match sequential process_movie calls
+        codes, uniques = pd.factorize(exploded, sort=False)
+        for actor in uniques:
+            self.add_actor(actor)
+        node_ids = np.fromiter((self.actor_to_idx[a] for a in uniques), dtype=np.int32, count=len(uniques))[codes]
+
+        movie_ids = pd.factorize(exploded.index)[0]
+        sizes = np.bincount(movie_ids)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        # Movies with the same cast size share one pair index template
+        for k in np.unique(sizes[sizes > 1]):
+            movie_starts = starts[sizes == k]
+            cast = node_ids[movie_starts[:, None] + np.arange(k)]
+            i, j = np.triu_indices(k, k=1)
+            rows, cols = cast[:, i].ravel(), cast[:, j].ravel()
+            self._buffer_edges(np.minimum(rows, cols), np.maximum(rows, cols))
+
+    def get_metrics(self):
+        """Calculate network metrics"""
+        n_actors = len(self.actor_to_idx)
+        if n_actors == 0:
+            return {
+                'num_nodes': 0,
+                'num_edges': 0,
+                'avg_degree': 0,
+                'density': 0
+            }
+        
+        adj_matrix = self.adj_matrix
+        
+        # Number of edges (upper triangle since matrix is symmetric)
+        num_edges = sp.triu(adj_matrix, k=1).nnz
+        
+        # Average degree
+        degrees = np.diff(adj_matrix.indptr)
+        avg_degree = np.mean(degrees)
+        
+        # Density
+        density = (2 * num_edges) / (n_actors * (n_actors - 1)) if n_actors > 1 else 0
+        
+        return {
+            'num_nodes': n_actors,
+            'num_edges': num_edges,
+            'avg_degree': avg_degree,
+            'density': density
+        }
+
+class SnapshotStore:
+    """Base network plus per-year edge deltas, materialized on demand"""
+    def __init__(self, base_network):
+        self.network = CollaborationNetwork()
+        self.network.actor_to_idx = base_network.actor_to_idx.copy()
+        self.network.idx_to_actor = base_network.idx_to_actor.copy()
+        self.network.adj_matrix = base_network.adj_matrix.copy()
+        self.network.next_idx = base_network.next_idx
+        
+        self.base_adj = base_network.to_sparse()
+        self.deltas = {}       # year -> symmetric CSR of the edges added that year
+        self.node_counts = {}  # year -> number of nodes; year's new nodes are [previous count, count)
+    
+    @property
+    def years(self):
+        return sorted(self.deltas)
+    
+    def add_year(self, year, actors):
+        """Process a year's movies and record them as a delta"""
+        self.network.process_movies(actors)
+        self.deltas[year] = self.network.buffered_delta()
+        self.node_counts[year] = self.network.next_idx
+        self.network.freeze()
+    
+    def materialize(self, year):
+        """Rebuild the network as of the end of the given year"""
+        if year not in self.deltas:
+            raise KeyError(f"No snapshot for year {year}")
+        n = self.node_counts[year]
+        
+        parts = [self.base_adj] + [self.deltas[y] for y in self.years if y <= year]
+        parts = [part.tocoo() for part in parts]
+        adj_matrix = sp.coo_matrix(
+            (np.concatenate([p.data for p in parts]),
+             (np.concatenate([p.row for p in parts]), np.concatenate([p.col for p in parts]))),
+            shape=(n, n)
+        ).tocsr()
+        
+        snapshot = CollaborationNetwork()
+        snapshot.node_index = self.network.node_index.truncated(n)
+        snapshot.adj_matrix = adj_matrix
+        return snapshot
+    
+    def save(self, directory='network_data'):
+        """Save base adjacency, yearly deltas and the shared node table"""
+        os.makedirs(directory, exist_ok=True)
+        
+        sp.save_npz(f'{directory}/base_network_adj.npz', self.base_adj)
+        for year, delta in self.deltas.items():
+            sp.save_npz(f'{directory}/snapshot_{year}_delta.npz', delta)
+        np.savez(
+            f'{directory}/snapshots_index.npz',
+            years=np.array(self.years),
+            node_counts=np.array([self.node_counts[y] for y in self.years]),
+        )
+        
+        self.network.node_index.save(directory)
+    
+    @classmethod
+    def load(cls, directory='network_data'):
+        """Load a store written by save"""
+        store = cls.__new__(cls)
+        store.base_adj = sp.load_npz(f'{directory}/base_network_adj.npz').tocsr()
+        
+        index = np.load(f'{directory}/snapshots_index.npz')
+        store.deltas = {}
+        store.node_counts = {}
+        for year, count in zip(index['years'].tolist(), index['node_counts'].tolist()):
+            store.deltas[year] = sp.load_npz(f'{directory}/snapshot_{year}_delta.npz').tocsr()
+            store.node_counts[year] = count
+        
+        store.network = CollaborationNetwork()
+        store.network.node_index = NodeIndex.load(directory)
+        return store
+
+def resize_adjacency(matrix, n):
+    """Pad a square sparse matrix with empty rows/columns up to n x n"""
+    if matrix.shape == (n, n):
+        return matrix
+    matrix = matrix.tocoo()
+    return sp.csr_matrix((matrix.data, (matrix.row, matrix.col)), shape=(n, n))
 
 def load_and_preprocess_data(base_file_path, snapshot_file_path):
     """Load and preprocess the datasets"""
-    base_df = pd.read_csv(base_file_path, sep='\t')
-    base_df['actors'] = base_df['actors'].apply(lambda x: str(x).split(','))
+    # Missing people stay ['nan'] as in the original TSV parsing, so the networks keep that node
+    base_df = fill_missing_lists(read_movies(base_file_path, columns=['actors']))
     
-    snapshot_df = pd.read_csv(snapshot_file_path, sep='\t')
-    snapshot_df['actors'] = snapshot_df['actors'].apply(lambda x: str(x).split(','))
+    snapshot_df = fill_missing_lists(read_movies(snapshot_file_path, columns=['release_date', 'actors']))
     snapshot_df['year'] = pd.to_datetime(snapshot_df['release_date']).dt.year
     
     print(f"Base dataset: {len(base_df)} movies")
@@ -98,44 +305,51 @@ def save_network(network, filename):
     """Save network to files"""
     os.makedirs('network_data', exist_ok=True)
     
-    np.save(f'network_data/{filename}_adj.npy', network.adj_matrix)
+    sp.save_npz(f'network_data/{filename}_adj.npz', network.to_sparse())
     
-    actor_mappings = {
-        'actor_to_idx': network.actor_to_idx,
-        'idx_to_actor': network.idx_to_actor
-    }
-    np.save(f'network_data/{filename}_mappings.npy', actor_mappings)
+    # Node ids are append-only, so one shared node table covers every saved network
+    network.node_index.save('network_data')
 
 def load_network(filename):
     """Load network from files"""
+    if filename.startswith('snapshot_') and os.path.exists('network_data/snapshots_index.npz') \
+            and not os.path.exists(f'network_data/{filename}_adj.npz') \
+            and not os.path.exists(f'network_data/{filename}_adj.npy'):
+        # Yearly snapshots are stored as deltas on top of the base network
+        year = int(filename[len('snapshot_'):])
+        return SnapshotStore.load('network_data').materialize(year)
+    
     network = CollaborationNetwork()
     
-    network.adj_matrix = np.load(f'network_data/{filename}_adj.npy')
+    if os.path.exists(f'network_data/{filename}_adj.npz'):
+        adj_matrix = sp.load_npz(f'network_data/{filename}_adj.npz')
+    else:
+        # Networks saved before the sparse format stored a dense matrix
+        adj_matrix = np.load(f'network_data/{filename}_adj.npy')
     
-    mappings = np.load(f'network_data/{filename}_mappings.npy', allow_pickle=True).item()
-    network.actor_to_idx = mappings['actor_to_idx']
-    network.idx_to_actor = mappings['idx_to_actor']
-    network.next_idx = len(network.actor_to_idx)
+    if os.path.exists(f'network_data/{filename}_mappings.npy'):
+        # Networks saved before the shared node table pickled their mapping dicts
+        mappings = np.load(f'network_data/{filename}_mappings.npy', allow_pickle=True).item()
+        network.actor_to_idx = mappings['actor_to_idx']
+        network.idx_to_actor = mappings['idx_to_actor']
+        network.next_idx = len(network.actor_to_idx)
+    else:
+        network.node_index = NodeIndex.load('network_data', count=adj_matrix.shape[0])
     
+    network.adj_matrix = adj_matrix
     return network
 
 def build_base_network(df):
     """Build initial collaboration network"""
     network = CollaborationNetwork()
-    
-    for _, row in df.iterrows():
-        network.process_movie(row['actors'])
+    network.process_movies(df['actors'])
+    network.freeze()
     
     return network
 
 def build_snapshot_networks(base_network, snapshot_df, start_year=2000, end_year=2024):
-    """Build yearly snapshot networks"""
-    snapshots = {}
-    current_network = CollaborationNetwork()
-    current_network.actor_to_idx = base_network.actor_to_idx.copy()
-    current_network.idx_to_actor = base_network.idx_to_actor.copy()
-    current_network.adj_matrix = base_network.adj_matrix.copy()
-    current_network.next_idx = base_network.next_idx
+    """Build yearly snapshot networks as a delta-encoded SnapshotStore"""
+    snapshots = SnapshotStore(base_network)
     
     save_network(base_network, 'base_network')
     print("Saved base network")
@@ -145,21 +359,16 @@ def build_snapshot_networks(base_network, snapshot_df, start_year=2000, end_year
         print(f"\nProcessing year {year}")
         print(f"Number of movies in {year}: {len(year_data)}")
         
-        for _, row in year_data.iterrows():
-            current_network.process_movie(row['actors'])
+        snapshots.add_year(year, year_data['actors'])
         
-        snapshots[year] = CollaborationNetwork()
-        snapshots[year].actor_to_idx = current_network.actor_to_idx.copy()
-        snapshots[year].idx_to_actor = current_network.idx_to_actor.copy()
-        snapshots[year].adj_matrix = current_network.adj_matrix.copy()
-        snapshots[year].next_idx = current_network.next_idx
-        
-        save_network(snapshots[year], f'snapshot_{year}')
-        
-        metrics = snapshots[year].get_metrics()
+        # The store's running network is the snapshot as of the end of this year
+        metrics = snapshots.network.get_metrics()
         print(f"Year {year} statistics:")
         print(f"Nodes = {metrics['num_nodes']}")
         print(f"Edges = {metrics['num_edges']}")
+    
+    snapshots.save('network_data')
+    print("Saved snapshot deltas")
         
     return snapshots
 
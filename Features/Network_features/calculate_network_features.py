@@ -1,32 +1,21 @@
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-class ActorDirectorCollaborationNetwork:
-    def __init__(self):
-        self.actor_to_idx = {}
-        self.director_to_idx = {}
-        self.idx_to_actor = {}
-        self.idx_to_director = {}
-        self.adj_matrix = None  # Adjacency matrix (actors x directors)
-        self.next_actor_idx = 0
-        self.next_director_idx = 0    
+from build_directors_network import load_network
+from node_index import NodeIndex
 
-def load_network(filename):
-    """Load network from files"""
-    network = ActorDirectorCollaborationNetwork()
-    
-    network.adj_matrix = np.load(f'network_data_directors/{filename}_adj.npy')
-    
-    mappings = np.load(f'network_data_directors/{filename}_mappings.npy', allow_pickle=True).item()
-    network.actor_to_idx = mappings['actor_to_idx']
-    network.director_to_idx = mappings['director_to_idx']
-    network.idx_to_actor = mappings['idx_to_actor']
-    network.idx_to_director = mappings['idx_to_director']
-    network.next_actor_idx = len(network.actor_to_idx)
-    network.next_director_idx = len(network.director_to_idx)
-    
-    return network
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from movie_store import fill_missing_lists, read_movies
+
+def get_collaboration_vector(network, idx):
+    """Dense adjacency row of an actor, for sparse or dense networks"""
+    row = network.adj_matrix[idx]
+    return row.toarray().ravel() if sp.issparse(row) else row
 
 def calculate_average_degree(network, actors):
     """Calculate average degree of a list of actors."""
@@ -38,7 +27,7 @@ def calculate_average_degree(network, actors):
     for actor in actors:
         if actor in network.actor_to_idx:
             idx = network.actor_to_idx[actor]
-            degree = np.count_nonzero(network.adj_matrix[idx])
+            degree = np.count_nonzero(get_collaboration_vector(network, idx))
         else:
             degree = 0
         sum_degrees += degree
@@ -57,7 +46,7 @@ def calculate_network_heterogeneity(network, actors):
     for actor in actors:
         if actor in network.actor_to_idx:
             idx = network.actor_to_idx[actor]
-            collaboration_vectors.append(network.adj_matrix[idx])
+            collaboration_vectors.append(get_collaboration_vector(network, idx))
         else:
             # Use zero vector with length equal to number of directors
             collaboration_vectors.append(np.zeros(network.adj_matrix.shape[1]))
@@ -86,11 +75,281 @@ def calculate_network_heterogeneity(network, actors):
 
     return total_similarity / num_pairs, not_found_count
 
-def load_and_preprocess_data(snapshot_file_path):
-    """Load and preprocess the snapshot dataset."""
-    snapshot_df = pd.read_csv(snapshot_file_path, sep='\t')
-    snapshot_df['actors'] = snapshot_df['actors'].apply(lambda x: str(x).split(','))
-    return snapshot_df
+class SnapshotStats:
+    """Row norms and degrees of a snapshot, computed once for batched features"""
+    def __init__(self, adj_matrix, actor_to_idx):
+        adj_matrix = sp.csr_matrix(adj_matrix, dtype=np.float64)
+        adj_matrix.eliminate_zeros()
+        
+        self.actor_to_idx = actor_to_idx
+        self.degrees = np.diff(adj_matrix.indptr)
+        norms = np.sqrt(np.asarray(adj_matrix.multiply(adj_matrix).sum(axis=1)).ravel())
+        inv_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        # Unit-length collaboration vectors; actors without collaborations stay zero
+        self.normalized = (sp.diags(inv_norms) @ adj_matrix).tocsr()
+    
+    def save(self, directory, name, idx_to_actor):
+        """Write the stats as raw .npy files so workers can memory-map them"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(f'{directory}/{name}_degrees.npy', self.degrees)
+        np.save(f'{directory}/{name}_data.npy', self.normalized.data)
+        np.save(f'{directory}/{name}_indices.npy', self.normalized.indices)
+        np.save(f'{directory}/{name}_indptr.npy', self.normalized.indptr)
+        np.save(f'{directory}/{name}_shape.npy', np.array(self.normalized.shape))
+        NodeIndex.from_mapping(idx_to_actor, self.normalized.shape[0]).save(directory, f'{name}_actors')
+    
+    @classmethod
+    def load(cls, directory, name):
+        """Memory-map stats written by save, read-only"""
+        stats = cls.__new__(cls)
+        stats.degrees = np.load(f'{directory}/{name}_degrees.npy', mmap_mode='r')
+        stats.normalized = sp.csr_matrix(
+            (np.load(f'{directory}/{name}_data.npy', mmap_mode='r'),
+             np.load(f'{directory}/{name}_indices.npy', mmap_mode='r'),
+             np.load(f'{directory}/{name}_indptr.npy', mmap_mode='r')),
+            shape=tuple(np.load(f'{directory}/{name}_shape.npy')),
+            copy=False
+        )
+        stats.actor_to_idx = NodeIndex.load(directory, f'{name}_actors')
+        return stats
+
+def _explode_names(column):
+    """One stripped name per (movie position, person), as the network builders store them"""
+    return pd.Series(column).reset_index(drop=True).explode().dropna().astype(str).str.strip()
+
+def calculate_batch_features(stats, actors):
+    """Average degree and heterogeneity for a column of actor lists in one pass.
+
+    For a movie with unit rows r_1..r_k, the sum of its Gram matrix is
+    ||r_1 + ... + r_k||^2 and its trace is the number of non-zero rows, so the
+    mean pairwise cosine is (||sum||^2 - trace) / (k * (k - 1)).
+    """
+    return pd.DataFrame(_batch_features(stats, _explode_names(actors), len(actors)))
+
+def _batch_features(stats, exploded, n_movies):
+    movie_pos = exploded.index.to_numpy()
+    if isinstance(stats.actor_to_idx, NodeIndex):
+        idx = stats.actor_to_idx.lookup(exploded).astype(np.int64)
+        found = idx >= 0
+    else:
+        idx = exploded.map(stats.actor_to_idx)
+        found = idx.notna().to_numpy()
+        idx = idx.fillna(-1).to_numpy().astype(np.int64)
+    
+    num_actors = np.bincount(movie_pos, minlength=n_movies)
+    not_found = np.bincount(movie_pos[~found], minlength=n_movies)
+    sum_degrees = np.bincount(movie_pos[found], weights=stats.degrees[idx[found]], minlength=n_movies)
+    average_degree = np.divide(sum_degrees, num_actors, out=np.zeros(n_movies), where=num_actors > 0)
+    
+    # movies x actors incidence matrix (counts repeated actors like the pair loop does)
+    incidence = sp.csr_matrix(
+        (np.ones(found.sum()), (movie_pos[found], idx[found])),
+        shape=(n_movies, stats.normalized.shape[0])
+    )
+    summed = incidence @ stats.normalized
+    gram_sum = np.asarray(summed.multiply(summed).sum(axis=1)).ravel()
+    trace = incidence @ (stats.normalized.getnnz(axis=1) > 0).astype(np.float64)
+    
+    num_pairs = num_actors * (num_actors - 1) / 2
+    heterogeneity = np.divide((gram_sum - trace) / 2, num_pairs, out=np.zeros(n_movies), where=num_pairs > 0)
+    not_found = np.where(num_actors < 2, 0, not_found)
+    
+    return {
+        'average_degree': average_degree,
+        'network_heterogeneity': heterogeneity,
+        'not_found': not_found
+    }
+
+class TemporalFeatureEngine:
+    """Single pass over movies in release order, updating one actor x director network"""
+    def __init__(self, merge_ratio=0.1, min_merge=100000):
+        self.actor_to_idx = {}
+        self.director_to_idx = {}
+        self.merge_ratio = merge_ratio
+        self.min_merge = min_merge
+        self._frozen = sp.csr_matrix((0, 0), dtype=np.int64)
+        # Collaborations added since the last merge, kept as COO chunks
+        self._pending_rows = []
+        self._pending_cols = []
+        self._n_pending = 0
+        # The chunks concatenated, built on first use and dropped when movies are added
+        self._pending_pairs = None
+        # Scratch actor id -> row of the batch being scored, -1 elsewhere
+        self._position = np.empty(0, dtype=np.int64)
+    
+    @property
+    def shape(self):
+        return len(self.actor_to_idx), len(self.director_to_idx)
+    
+    def _register(self, mapping, names):
+        """Assign indices to new names and return the indices of all names"""
+        codes, uniques = pd.factorize(names)
+        for name in uniques:
+            if name not in mapping:
+                mapping[name] = len(mapping)
+        return np.fromiter((mapping[name] for name in uniques), dtype=np.int64, count=len(uniques))[codes]
+    
+    def _pending(self):
+        """(actor ids, director ids) of every pending collaboration"""
+        if self._pending_pairs is None:
+            self._pending_pairs = np.concatenate(self._pending_rows), np.concatenate(self._pending_cols)
+        return self._pending_pairs
+    
+    def _merge(self):
+        """Fold pending collaborations into the CSR matrix"""
+        self._frozen = pad_matrix(self._frozen, self.shape)
+        if self._n_pending:
+            rows, cols = self._pending()
+            self._frozen = (self._frozen + sp.csr_matrix((np.ones(self._n_pending), (rows, cols)), shape=self.shape)).tocsr()
+        self._pending_rows, self._pending_cols, self._n_pending = [], [], 0
+        self._pending_pairs = None
+    
+    def add_movies(self, actors, directors):
+        """Add every actor-director collaboration of a batch of movies"""
+        pairs = pd.merge(
+            _explode_names(actors).rename('actor').rename_axis('movie').reset_index(),
+            _explode_names(directors).rename('director').rename_axis('movie').reset_index(),
+            on='movie'
+        )
+        if pairs.empty:
+            return
+        
+        self._pending_rows.append(self._register(self.actor_to_idx, pairs['actor']))
+        self._pending_cols.append(self._register(self.director_to_idx, pairs['director']))
+        self._n_pending += len(pairs)
+        self._pending_pairs = None
+        # Merging only once pending grows past a fraction of the matrix keeps updates amortized
+        if self._n_pending > max(self.merge_ratio * self._frozen.nnz, self.min_merge):
+            self._merge()
+    
+    def score(self, actors):
+        """Features of a batch of movies against the current state of the network.
+
+        Only the rows of the batch's actors are read: sliced out of the merged
+        matrix and picked out of the pending collaborations, so the cost does not
+        grow with the size of the network.
+        """
+        exploded = _explode_names(actors)
+        names = [name for name in pd.unique(exploded) if name in self.actor_to_idx]
+        # Actors already in the merged matrix first, so its rows are one slice
+        n_frozen = self._frozen.shape[0]
+        names.sort(key=lambda name: self.actor_to_idx[name] >= n_frozen)
+        ids = np.array([self.actor_to_idx[name] for name in names], dtype=np.int64)
+        
+        rows = pad_matrix(self._frozen[ids[ids < n_frozen]], (len(ids), self.shape[1]))
+        if self._n_pending and len(ids):
+            pending_rows, pending_cols = self._pending()
+            if len(self._position) < self.shape[0]:
+                self._position = np.full(max(self.shape[0], 2 * len(self._position)), -1, dtype=np.int64)
+            self._position[ids] = np.arange(len(ids))
+            pos = self._position[pending_rows]
+            self._position[ids] = -1
+            hit = pos >= 0
+            rows = rows + sp.csr_matrix((np.ones(hit.sum()), (pos[hit], pending_cols[hit])), shape=rows.shape)
+        
+        stats = SnapshotStats(rows, {name: i for i, name in enumerate(names)})
+        return pd.DataFrame(_batch_features(stats, exploded, len(actors)))
+
+def pad_matrix(matrix, shape):
+    """Grow a sparse matrix with empty rows/columns up to shape"""
+    if matrix.shape == shape:
+        return matrix
+    matrix = matrix.tocoo()
+    return sp.csr_matrix((matrix.data, (matrix.row, matrix.col)), shape=shape)
+
+def calculate_streaming_features(base_df, movies_df, start_year=2000, end_year=2024, granularity='year'):
+    """Point-in-time features for every movie without any snapshot files.
+
+    With granularity='year' this reproduces the snapshot pipeline: movies of
+    startYear y are scored against the base network plus every movie whose
+    release_date falls in start_year..y-1 (the year build_directors_network
+    files a movie under). With 'date' a movie sees every movie released before
+    its release date; movies without a release_date are placed on January 1st
+    of their startYear.
+    """
+    engine = TemporalFeatureEngine()
+    engine.add_movies(base_df['actors'], base_df['directors'])
+    scored = movies_df[movies_df['startYear'].between(start_year, end_year)]
+    
+    groups = []
+    if granularity == 'year':
+        release_year = pd.to_datetime(movies_df['release_date']).dt.year
+        for year in range(start_year, end_year + 1):
+            group = scored[scored['startYear'] == year]
+            groups.append((group, engine.score(group['actors'])))
+            added = movies_df[release_year == year]
+            engine.add_movies(added['actors'], added['directors'])
+    else:
+        dates = pd.to_datetime(scored['release_date'])
+        undated = dates.isna()
+        if undated.any():
+            print(f"{int(undated.sum())} movies without a release_date are placed at the start of their startYear")
+            dates = dates.fillna(pd.to_datetime(scored['startYear'].astype(int).astype(str), format='%Y'))
+        for _, group in scored.groupby(dates, sort=True):
+            groups.append((group, engine.score(group['actors'])))
+            engine.add_movies(group['actors'], group['directors'])
+    
+    features = pd.concat([group_features for _, group_features in groups], ignore_index=True)
+    features.insert(0, 'movie_id', np.concatenate([group['tconst'].to_numpy() for group, _ in groups]))
+    features.insert(1, 'year', np.concatenate([group['startYear'].to_numpy() for group, _ in groups]))
+    return features
+
+# Only the columns each step touches: scored movies, snapshot-pipeline movies and the base network's movies
+MOVIE_COLUMNS = ['tconst', 'startYear', 'release_date', 'actors', 'directors']
+SNAPSHOT_MOVIE_COLUMNS = ['tconst', 'startYear', 'actors']
+BASE_COLUMNS = ['actors', 'directors']
+
+def load_and_preprocess_data(snapshot_file_path, columns=MOVIE_COLUMNS):
+    """Load the snapshot dataset (Parquet when converted) with people as lists.
+
+    Missing people come back as ['nan'], as the original TSV parsing gave them, so
+    movies without actors or directors score against the same network nodes.
+    """
+    return fill_missing_lists(read_movies(snapshot_file_path, columns=columns))
+
+def export_snapshot_stats(network_name, directory='network_data_directors/stats_mmap'):
+    """Load a snapshot, compute its stats and write them for memory-mapping"""
+    network = load_network(network_name)
+    SnapshotStats(network.adj_matrix, network.actor_to_idx).save(directory, network_name, network.idx_to_actor)
+    return network_name
+
+def calculate_chunk_features(task):
+    """Worker: features of one chunk of movies against a memory-mapped snapshot"""
+    network_name, directory, movie_ids, year, actors = task
+    stats = SnapshotStats.load(directory, network_name)
+    chunk_features = calculate_batch_features(stats, actors)
+    chunk_features.insert(0, 'movie_id', movie_ids)
+    chunk_features.insert(1, 'year', year)
+    return chunk_features
+
+def calculate_movie_features_parallel(snapshot_df, start_year=2000, end_year=2024, workers=4, chunk_size=2000,
+                                      directory='network_data_directors/stats_mmap'):
+    """Same output as calculate_movie_features, with years and movie chunks spread over a process pool.
+
+    Reads the saved snapshot files, unlike calculate_streaming_features, which main() runs by default.
+    """
+    network_names = {year: 'base_network' if year == start_year else f'snapshot_{year - 1}'
+                     for year in range(start_year, end_year + 1)}
+    
+    tasks = []
+    for year, network_name in network_names.items():
+        year_data = snapshot_df[snapshot_df['startYear'] == year]
+        for start in range(0, len(year_data), chunk_size):
+            chunk = year_data.iloc[start:start + chunk_size]
+            tasks.append((network_name, directory, chunk['tconst'].to_numpy(), year, chunk['actors'].tolist()))
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Each snapshot is loaded and normalized once, then shared read-only through the page cache
+        unique_names = sorted(set(network_names.values()))
+        for network_name in executor.map(export_snapshot_stats, unique_names, [directory] * len(unique_names)):
+            print(f"Exported {network_name}")
+        
+        # map() yields in submission order, so the result is deterministic
+        features = list(executor.map(calculate_chunk_features, tasks))
+    
+    if not features:
+        return pd.DataFrame(columns=['movie_id', 'year', 'average_degree', 'network_heterogeneity', 'not_found'])
+    return pd.concat(features, ignore_index=True)
 
 def calculate_movie_features(snapshot_df, start_year=2000, end_year=2024):
     """Calculate features for each movie in the snapshot dataframe."""
@@ -108,29 +367,41 @@ def calculate_movie_features(snapshot_df, start_year=2000, end_year=2024):
         year_data = snapshot_df[snapshot_df['startYear'] == year]
         print(f"Number of movies in {year}: {len(year_data)}")
         
-        for _, row in year_data.iterrows():
-            movie_id = row['tconst']
-            actors = row['actors']
-            
-            avg_degree = calculate_average_degree(network, actors)
-            heterogeneity, not_found = calculate_network_heterogeneity(network, actors)
-            
-            features.append({
-                'movie_id': movie_id,
-                'year': year,
-                'average_degree': avg_degree,
-                'network_heterogeneity': heterogeneity,
-                'not_found': not_found
-            })
-    
-    return pd.DataFrame(features)
+        stats = SnapshotStats(network.adj_matrix, network.actor_to_idx)
+        year_features = calculate_batch_features(stats, year_data['actors'])
+        year_features.insert(0, 'movie_id', year_data['tconst'].to_numpy())
+        year_features.insert(1, 'year', year)
+        features.append(year_features)
+    
+    return pd.concat(features, ignore_index=True)
 
 def main():
+    # Two separate pipelines: by default the streaming engine rebuilds the network from the
+    # movie tables in one pass; with --workers > 1 the features are read off the yearly
+    # snapshot files written by build_directors_network, which must be up to date. Both give
+    # the same features at year granularity; only the streaming pipeline can go by release date.
+    parser = argparse.ArgumentParser(description="Calculate actor-director network features for each movie")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="More than 1 switches to the saved-snapshot pipeline, computed on a process pool")
+    parser.add_argument('--granularity', choices=['year', 'date'],
+                        help="Point-in-time resolution of the streaming pipeline (default: year)")
+    args = parser.parse_args()
+    if args.workers > 1 and args.granularity is not None:
+        parser.error("--granularity only applies to the streaming pipeline; it cannot be combined with --workers > 1")
+    
     print("Loading and preprocessing data...")
-    snapshot_df = load_and_preprocess_data('filtered_final_movies_5.tsv')
+    if args.workers > 1:
+        snapshot_df = load_and_preprocess_data('filtered_final_movies_5.tsv', SNAPSHOT_MOVIE_COLUMNS)
+    else:
+        snapshot_df = load_and_preprocess_data('filtered_final_movies_5.tsv')
+        base_df = load_and_preprocess_data('add_movies_actors_5_directors.tsv', BASE_COLUMNS)
     
     print("\nCalculating movie features...")
-    features_df = calculate_movie_features(snapshot_df, start_year=2000, end_year=2024)
+    if args.workers > 1:
+        features_df = calculate_movie_features_parallel(snapshot_df, start_year=2000, end_year=2024, workers=args.workers)
+    else:
+        features_df = calculate_streaming_features(base_df, snapshot_df, start_year=2000, end_year=2024,
+                                                   granularity=args.granularity or 'year')
     
     features_df.to_csv('movie_actors_directors_network_features.tsv', sep='\t', index=False)
     print("\nFeatures saved to movie_network_features.tsv")
@@ -0,0 +1,65 @@
+import numpy as np
+import os
+
+class NodeIndex:
+    """Columnar nconst <-> index table stored as fixed-width NumPy arrays"""
+    def __init__(self, nconsts, sorted_nconsts=None, sorted_ids=None, count=None):
+        """nconsts is in index order; the sorted arrays are derived if not given"""
+        self.nconsts = np.asarray(nconsts)
+        if self.nconsts.dtype.kind != 'S':
+            self.nconsts = np.array([str(n).encode('utf-8') for n in self.nconsts], dtype='S')
+        if sorted_ids is None:
+            sorted_ids = np.argsort(self.nconsts, kind='stable').astype(np.int32)
+            sorted_nconsts = self.nconsts[sorted_ids]
+        self.sorted_nconsts = sorted_nconsts
+        self.sorted_ids = sorted_ids
+        self.count = len(self.nconsts) if count is None else count
+
+    @classmethod
+    def from_mapping(cls, idx_to_actor, count=None):
+        """Build from an idx -> nconst dict"""
+        count = len(idx_to_actor) if count is None else count
+        return cls([idx_to_actor[idx] for idx in range(count)])
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, actors):
+        """Vectorized nconst -> index lookup, -1 for actors not in the table"""
+        keys = np.array([str(a).encode('utf-8') for a in actors], dtype='S')
+        if len(keys) == 0 or len(self.sorted_nconsts) == 0:
+            return np.full(len(keys), -1, dtype=np.int32)
+
+        pos = np.searchsorted(self.sorted_nconsts, keys)
+        pos = np.minimum(pos, len(self.sorted_nconsts) - 1)
+        ids = np.asarray(self.sorted_ids[pos], dtype=np.int32)
+        found = (self.sorted_nconsts[pos] == keys) & (ids < self.count)
+        return np.where(found, ids, -1)
+
+    def nconst(self, idx):
+        """Index -> nconst"""
+        return self.nconsts[idx].decode('utf-8')
+
+    def to_dicts(self):
+        """actor_to_idx and idx_to_actor dicts for the first count nodes"""
+        actors = np.char.decode(np.asarray(self.nconsts[:self.count]), 'utf-8').tolist()
+        return dict(zip(actors, range(self.count))), dict(enumerate(actors))
+
+    def save(self, directory, prefix='nodes'):
+        """Write the table as three .npy files"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(f'{directory}/{prefix}.npy', self.nconsts[:self.count])
+        np.save(f'{directory}/{prefix}_sorted.npy', self.sorted_nconsts)
+        np.save(f'{directory}/{prefix}_sorted_ids.npy', self.sorted_ids)
+
+    @classmethod
+    def load(cls, directory, prefix='nodes', count=None):
+        """Memory-map a saved table, optionally restricted to the first count nodes"""
+        nconsts = np.load(f'{directory}/{prefix}.npy', mmap_mode='r')
+        sorted_nconsts = np.load(f'{directory}/{prefix}_sorted.npy', mmap_mode='r')
+        sorted_ids = np.load(f'{directory}/{prefix}_sorted_ids.npy', mmap_mode='r')
+        return cls(nconsts, sorted_nconsts, sorted_ids, count)
+
+    def truncated(self, count):
+        """View of the table restricted to the first count nodes"""
+        return NodeIndex(self.nconsts, self.sorted_nconsts, self.sorted_ids, count)
@@ -8,6 +8,8 @@ import numba
 from numpy.typing import NDArray
 import pandas as pd
 
+from build_networks import load_network
+
 @dataclass
 class NetworkNode:
     position: np.ndarray
@@ -47,23 +49,25 @@ class OptimizedNetworkVisualizer:
                 
         return displacement
 
-    def force_directed_layout(self, iterations: int = 50) -> Dict[int, Tuple[float, float]]:
+    def force_directed_layout(self, iterations: int = 50, adj_matrix: NDArray = None) -> Dict[int, Tuple[float, float]]:
         """Optimized Fruchterman-Reingold layout algorithm"""
-        n_nodes = self.adj_matrix.shape[0]
+        if adj_matrix is None:
+            adj_matrix = self.adj_matrix
+        n_nodes = adj_matrix.shape[0]
         k = 1.0 / np.sqrt(n_nodes)
         
         # Initialize positions as numpy array for vectorization
         positions = np.random.uniform(-1, 1, (n_nodes, 2))
         
         # Pre-calculate node degrees
-        degrees = np.sum(self.adj_matrix, axis=1)
+        degrees = np.sum(adj_matrix, axis=1)
         
         t = 1.0
         dt = 0.95
         
         for _ in range(iterations):
             # Calculate all forces at once using numba-accelerated function
-            displacement = self._calculate_forces(positions, self.adj_matrix, k, t)
+            displacement = self._calculate_forces(positions, adj_matrix, k, t)
             
             # Update positions - vectorized
             displacement_length = np.maximum(0.01, np.sqrt(np.sum(displacement * displacement, axis=1)))
@@ -91,17 +95,17 @@ class OptimizedNetworkVisualizer:
         
         if len(component_nodes) > max_nodes:
             # Use vectorized operations for degree calculation
-            degrees = np.sum(self.adj_matrix[component_nodes][:, component_nodes], axis=1)
+            degrees = np.asarray(sparse_matrix[component_nodes][:, component_nodes].sum(axis=1)).ravel()
             component_nodes = component_nodes[np.argsort(degrees)[-max_nodes:]]
             
-        return component_nodes, self.adj_matrix[np.ix_(component_nodes, component_nodes)]
+        return component_nodes, sparse_matrix[component_nodes][:, component_nodes].toarray()
 
     def visualize_network(self, min_weight: int = 1, max_nodes: int = 50) -> plt.Figure:
         """Optimized network visualization"""
         component_nodes, sub_matrix = self.get_largest_component(max_nodes)
         
-        # Calculate layout once
-        self.force_directed_layout()
+        # Calculate layout once, on the selected component only
+        self.force_directed_layout(adj_matrix=sub_matrix)
         
         fig, ax = plt.subplots(figsize=(15, 15))
         
@@ -144,9 +148,7 @@ class OptimizedNetworkVisualizer:
         return plt
 
 
-def replace_nconst_with_primary_name_and_update_idx(mappings_file, actors_file):
-    # Load the mappings
-    mappings = np.load(mappings_file, allow_pickle=True).item()
+def replace_nconst_with_primary_name_and_update_idx(mappings, actors_file):
     actor_to_idx = mappings.get("actor_to_idx", {})
     idx_to_actor = mappings.get("idx_to_actor", {})
 
@@ -177,14 +179,12 @@ def replace_nconst_with_primary_name_and_update_idx(mappings_file, actors_file):
 
 def load_and_visualize_snapshot(year: int, min_weight: int = 1, max_nodes: int = 50) -> None:
     """Load and visualize network snapshot efficiently"""
-    # Use memory-mapped arrays for large files
-    adj_matrix = np.load(f'network_data/snapshot_{year}_adj.npy', mmap_mode='r')
-    # mappings = np.load(f'network_data/snapshot_{year}_mappings.npy', allow_pickle=True).item()
-    mappings_file = f'network_data/snapshot_{year}_mappings.npy'  # Replace {year} with the actual year
+    network = load_network(f'snapshot_{year}')
+    mappings = {'actor_to_idx': network.actor_to_idx, 'idx_to_actor': network.idx_to_actor}
     actors_file = 'final_actors_3_bf.tsv'
-    mappings = replace_nconst_with_primary_name_and_update_idx(mappings_file, actors_file)
+    mappings = replace_nconst_with_primary_name_and_update_idx(mappings, actors_file)
 
-    visualizer = OptimizedNetworkVisualizer(adj_matrix, mappings['idx_to_actor'])
+    visualizer = OptimizedNetworkVisualizer(network.adj_matrix, mappings['idx_to_actor'])
     plt = visualizer.visualize_network(min_weight=min_weight, max_nodes=max_nodes)
     plt.savefig(f'network_viz/network_snapshot_{year}.png', dpi=300, bbox_inches='tight')
     plt.close()
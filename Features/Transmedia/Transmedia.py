@@ -1,84 +1,33 @@
-
 import pandas as pd
-import csv
-import re
-import time
-import google.generativeai as genai
 import os
+import sys
 
-os.environ["GEMINI_API_KEY"] = ""
-
-
-
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-
-# models = genai.list_models()
-# for model in models:
-#     print(model)
-
-generation_config = {
-    "temperature": 0,
-    "top_p": 0.95,
-    "top_k": 40,
-    "max_output_tokens": 2,
-    "response_mime_type": "text/plain",
-}
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Common'))
+from batch_classifier import BatchClassifier, GeminiBackend, BATCH_INSTRUCTIONS, LABELS, classify_movies
 
 system_prompt = """
     Transmedia storytelling is a narrative technique in which a story is told across multiple platforms or media, with each medium offering a unique perspective and adding to the overall narrative. For example, a story might start as a movie, but then expand into books, games, comics, and other forms of media, with each medium contributing new and complementary parts of the storyline.
 
     Movie Adaptation is the process of reimagining a story from another medium, like a book or game, into a movie. It translates the original narrative into a cinematic format, often making changes to suit the visual and time-bound nature of film.
 
-    You're going to be given a movie name:
+    For each movie:
     * Output YES if the movie is either an adaptation or transmedia storytelling
     * Output NO if the movie is not
     * Output UNKNOWN if you're not sure.
-"""
-model = genai.GenerativeModel(
-    model_name="gemini-2.0-flash-exp",
-    generation_config=generation_config,
-    system_instruction=system_prompt,
-)
-
-chat_session = model.start_chat()
-
-
-input_file = "final_movies_3_bf.tsv"  
-output_file = "results.tsv"
-fail_log = "failed_batches.txt"
-
-df = pd.read_csv(input_file, delimiter="\t", encoding="utf-8")
-
-failures = []
-
-
-with open(output_file, "a", encoding="utf-8", newline="") as result_file, open(fail_log, "a", encoding="utf-8") as fail_file:
-    writer = csv.writer(result_file, delimiter="\t")
-    writer.writerow(["tconst", "Title", "Year", "Response"])
-
-    for index, row in df.iterrows():
-        title = row["primaryTitle"]
-        year = row["startYear"]
-        imdb_id = row["tconst"]
-        formatted_title = f"{title} ({year})"
+""" + BATCH_INSTRUCTIONS % ", ".join(LABELS)
 
-        try:
-            print(f"Processing: {formatted_title}")
-            response = chat_session.send_message(formatted_title)
-            clean_response = re.sub(r'[\r\n]+', ' ', response.text).strip().strip('"')
-            print(clean_response)
-            writer.writerow([imdb_id, title, year, clean_response])
-            result_file.flush()
+if __name__ == "__main__":
+    input_file = "final_movies_3_bf.tsv"
+    output_file = "results.tsv"
+    fail_log = "failed_batches.txt"
 
-        except Exception as e:
-            failures.append(index)
-            fail_file.write(f"{imdb_id}")
-            fail_file.flush()
+    df = pd.read_csv(input_file, delimiter="\t", encoding="utf-8")
 
-        if (index + 1) % 10 == 0:
-            time.sleep(60)
+    backend = GeminiBackend(system_prompt, api_key=os.environ.get("GEMINI_API_KEY", ""))
+    classifier = BatchClassifier(backend, batch_size=50, requests_per_minute=10)
+    failures = classify_movies(df, classifier, output_file, fail_log)
 
-if failures:
-    print(f"Failures logged in {fail_log}")
-else:
-    print(f"All rows processed successfully. Results saved to {output_file}")
+    if failures:
+        print(f"Failures logged in {fail_log}")
+    else:
+        print(f"All rows processed successfully. Results saved to {output_file}")
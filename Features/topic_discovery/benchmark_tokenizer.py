@@ -0,0 +1,51 @@
+import argparse
+import os
+import re
+import time
+
+from tokenizer import Tokenizer, tokenize_many
+from topic_model import movie_texts
+
+# Compare the Tokenizer pipeline with the preprocess() function LDA.ipynb used, on the full movie corpus
+
+def notebook_preprocess(stop_words, stemmer=None):
+    """preprocess() exactly as it was in LDA.ipynb, with the stemming line optionally enabled"""
+    def preprocess(text):
+        text = re.sub(r'[^\w\s]', '', text)
+        words = [word for word in text.lower().split() if word not in stop_words]
+        if stemmer is not None:
+            words = [stemmer.stem(word) for word in words]
+        return words
+    return preprocess
+
+def time_run(name, run, documents):
+    start = time.perf_counter()
+    tokens = run()
+    elapsed = time.perf_counter() - start
+    count = sum(len(doc) for doc in tokens)
+    print(f"{name}: {len(documents) / elapsed:,.0f} docs/s, {count / elapsed:,.0f} tokens/s ({elapsed:.1f}s)")
+    return tokens
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark topic-model text preprocessing")
+    parser.add_argument('movies', nargs='?', default='../Common/rly_final_movies.tsv')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--stem', action='store_true', help="Also compare uncached and cached Porter stemming")
+    args = parser.parse_args()
+
+    documents = [text for _, text in movie_texts(args.movies)]
+    print(f"Documents: {len(documents)}")
+
+    tokenizer = Tokenizer(stem=args.stem)
+    stemmer = tokenizer.stemmer if args.stem else None
+    preprocess = notebook_preprocess(tokenizer.stop_words, stemmer)
+
+    reference = time_run("LDA.ipynb preprocess", lambda: [preprocess(doc) for doc in documents], documents)
+    single = time_run("Tokenizer, 1 process", lambda: list(tokenize_many(documents, Tokenizer(stem=args.stem))), documents)
+    parallel = time_run(f"Tokenizer, {args.workers} processes",
+                        lambda: list(tokenize_many(documents, Tokenizer(stem=args.stem), workers=args.workers)), documents)
+
+    print(f"Same tokens as the notebook: {reference == single == parallel}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import hashlib
+import re
+from itertools import islice
+from multiprocessing import Pool
+
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+_english_stop_words = None
+
+def english_stop_words():
+    """NLTK English stop words, downloaded on first use"""
+    global _english_stop_words
+    if _english_stop_words is None:
+        import nltk
+        from nltk.corpus import stopwords
+        nltk.download('stopwords', quiet=True)
+        _english_stop_words = frozenset(stopwords.words('english'))
+    return _english_stop_words
+
+class Tokenizer:
+    """Punctuation-stripped, lowercased words minus stop words, optionally Porter-stemmed.
+
+    Stems are memoized per distinct word: a corpus has far fewer distinct words
+    than tokens, and PorterStemmer.stem is the slowest step by far.
+    """
+    def __init__(self, stop_words=None, stem=False):
+        self.stop_words = frozenset(english_stop_words() if stop_words is None else stop_words)
+        self.stem = stem
+        self.stems = {}
+        self.stemmer = None
+        if stem:
+            from nltk.stem import PorterStemmer
+            self.stemmer = PorterStemmer()
+
+    @property
+    def version(self):
+        """Identifies the settings, so caches of tokenized text are rebuilt when they change"""
+        words = hashlib.sha1('\n'.join(sorted(self.stop_words)).encode('utf-8')).hexdigest()[:8]
+        return f"stem={self.stem}|stop_words={words}"
+
+    def stem_word(self, word):
+        stem = self.stems.get(word)
+        if stem is None:
+            stem = self.stems[word] = self.stemmer.stem(word)
+        return stem
+
+    def __call__(self, text):
+        stop_words = self.stop_words
+        words = [word for word in PUNCTUATION.sub('', text).lower().split() if word not in stop_words]
+        if self.stem:
+            words = [self.stem_word(word) for word in words]
+        return words
+
+    def tokenize_chunk(self, texts):
+        return [self(text) for text in texts]
+
+def _chunks(texts, chunksize):
+    texts = iter(texts)
+    while True:
+        chunk = list(islice(texts, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+# Each worker process keeps one tokenizer, and with it one stem cache, for all its chunks
+_worker_tokenizer = None
+
+def _init_worker(tokenizer):
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+def _tokenize_chunk(texts):
+    return _worker_tokenizer.tokenize_chunk(texts)
+
+def tokenize_many(texts, tokenizer, workers=1, chunksize=2000):
+    """Yield the tokens of each text in order, tokenizing chunks on `workers` processes.
+
+    Texts are consumed a window of workers * 4 chunks at a time, so a streamed
+    corpus is never fully in memory.
+    """
+    if workers <= 1:
+        for chunk in _chunks(texts, chunksize):
+            yield from tokenizer.tokenize_chunk(chunk)
+        return
+
+    with Pool(workers, initializer=_init_worker, initargs=(tokenizer,)) as pool:
+        chunks = _chunks(texts, chunksize)
+        while True:
+            window = list(islice(chunks, workers * 4))
+            if not window:
+                return
+            for tokens in pool.imap(_tokenize_chunk, window):
+                yield from tokens
@@ -0,0 +1,95 @@
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from topic_model import MODEL_DIR, document_hashes, load_model, new_documents
+
+TOPICS_FILE = 'lda_topics.parquet'
+
+def topic_matrix(lda, corpus, chunksize=2000):
+    """Dense float32 (docs x topics) topic distributions, inferred a chunk of documents at a time.
+
+    Unlike get_document_topics(minimum_probability=0), tiny probabilities are kept,
+    so every row has exactly num_topics columns.
+    """
+    parts = []
+    chunk = []
+    for bow in corpus:
+        chunk.append(bow)
+        if len(chunk) == chunksize:
+            parts.append(_infer(lda, chunk))
+            chunk = []
+    if chunk:
+        parts.append(_infer(lda, chunk))
+    if not parts:
+        return np.zeros((0, lda.num_topics), dtype=np.float32)
+    return np.vstack(parts)
+
+def _infer(lda, chunk):
+    gamma, _ = lda.inference(chunk)
+    return (gamma / gamma.sum(axis=1, keepdims=True)).astype(np.float32)
+
+def topic_frame(tconsts, matrix):
+    """tconst plus one 'Topic i' column per topic, the layout of lda_topics.tsv"""
+    frame = pd.DataFrame(matrix, columns=[f"Topic {i}" for i in range(matrix.shape[1])])
+    frame.insert(0, 'tconst', np.asarray(tconsts))
+    return frame
+
+def model_id(model_dir=MODEL_DIR):
+    """Hash of the saved model file, so topics are rescored after retraining"""
+    digest = hashlib.sha1()
+    with open(os.path.join(model_dir, 'lda.model'), 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _state_path(output):
+    return os.path.splitext(output)[0] + '.documents.json'
+
+def write_topics(frame, output=TOPICS_FILE, hashes=None, model=None):
+    """Write the topic table and remember which text and model each row was scored with"""
+    frame.to_parquet(output, index=False)
+    if hashes is not None:
+        with open(_state_path(output), 'w') as file:
+            json.dump({'model': model, 'text_hash': dict(zip(hashes['tconst'], hashes['text_hash']))}, file)
+
+def update_topics(path, model_dir=MODEL_DIR, output=TOPICS_FILE, chunksize=2000):
+    """Score only movies that are new, whose text changed, or all of them if the model changed"""
+    lda, _, tokenizer = load_model(model_dir)
+    current_model = model_id(model_dir)
+    hashes = document_hashes(path)
+
+    existing = None
+    scored = pd.DataFrame(columns=['tconst', 'text_hash'])
+    if os.path.exists(output) and os.path.exists(_state_path(output)):
+        with open(_state_path(output)) as file:
+            state = json.load(file)
+        if state['model'] == current_model:
+            existing = pd.read_parquet(output)
+            scored = pd.DataFrame(list(state['text_hash'].items()), columns=['tconst', 'text_hash'])
+
+    documents = list(new_documents(path, scored))
+    corpus = (lda.id2word.doc2bow(tokenizer(text)) for _, text in documents)
+    new_rows = topic_frame([tconst for tconst, _ in documents], topic_matrix(lda, corpus, chunksize))
+
+    if existing is not None:
+        new_rows = pd.concat([existing[~existing['tconst'].isin(new_rows['tconst'])], new_rows], ignore_index=True)
+    # Same row order as the movie table, dropping movies that are no longer in it
+    frame = new_rows.set_index('tconst').reindex(hashes['tconst']).reset_index()
+    write_topics(frame, output, hashes, current_model)
+    return len(documents)
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the topic distribution of every movie, scoring only new ones")
+    parser.add_argument('movies', nargs='?', default='../Common/rly_final_movies.tsv')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--output', default=TOPICS_FILE)
+    args = parser.parse_args()
+
+    print(f"Scored {update_topics(args.movies, args.model_dir, args.output)} movies, topics saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
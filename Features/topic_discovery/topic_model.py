@@ -0,0 +1,144 @@
+import argparse
+import hashlib
+import os
+import json
+import pandas as pd
+from gensim import corpora
+from gensim.models import LdaMulticore
+
+from tokenizer import Tokenizer, tokenize_many
+
+TEXT_COLUMNS = ['overview', 'synopsis', 'keywords']
+NUM_TOPICS = 30
+CACHE_DIR = 'lda_cache'
+MODEL_DIR = 'lda_model'
+
+def movie_texts(path, chunksize=20000):
+    """Stream (tconst, overview + synopsis + keywords) pairs from a movie TSV"""
+    for chunk in pd.read_csv(path, sep='\t', usecols=['tconst'] + TEXT_COLUMNS, chunksize=chunksize):
+        text = chunk['overview'].fillna('') + " " + chunk['synopsis'].fillna('') + " " + chunk['keywords'].fillna('')
+        yield from zip(chunk['tconst'], text)
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def document_hashes(path):
+    """tconst -> hash of its text, to spot new and changed movies"""
+    return pd.DataFrame([(tconst, text_hash(text)) for tconst, text in movie_texts(path)], columns=['tconst', 'text_hash'])
+
+def corpus_key(hashes, tokenizer, no_below=None, no_above=None):
+    """Content hash of the documents and of everything that shapes their bag of words"""
+    digest = hashlib.sha256(f"{tokenizer.version}|{no_below}|{no_above}".encode('utf-8'))
+    for tconst, doc_hash in zip(hashes['tconst'], hashes['text_hash']):
+        digest.update(f"{tconst}\t{doc_hash}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def build_corpus(path, cache_dir=CACHE_DIR, no_below=None, no_above=None, tokenizer=None, workers=1):
+    """Tokenized bag-of-words corpus of a movie TSV as a disk-backed MmCorpus.
+
+    The corpus, its dictionary and the documents' text hashes are cached under a key
+    derived from the documents' content, so an unchanged movie table is never
+    re-tokenized. Documents are streamed, one in memory at a time. With no_below
+    or no_above set, rare and common words are dropped (Dictionary.filter_extremes).
+    Tokenization is spread over `workers` processes.
+    """
+    tokenizer = tokenizer or Tokenizer()
+    hashes = document_hashes(path)
+    prefix = os.path.join(cache_dir, corpus_key(hashes, tokenizer, no_below, no_above))
+    corpus_file, dictionary_file, hashes_file = f'{prefix}.mm', f'{prefix}.dict', f'{prefix}.documents.tsv'
+
+    if not all(os.path.exists(f) for f in (corpus_file, dictionary_file, hashes_file)):
+        os.makedirs(cache_dir, exist_ok=True)
+        dictionary = corpora.Dictionary()
+        # One pass: ids are assigned while the bag of words is written out
+        texts = (text for _, text in movie_texts(path))
+        bows = (dictionary.doc2bow(tokens, allow_update=True) for tokens in tokenize_many(texts, tokenizer, workers))
+        raw_file = corpus_file if no_below is None and no_above is None else f'{prefix}.raw.mm'
+        corpora.MmCorpus.serialize(raw_file, bows, id2word=dictionary)
+
+        if raw_file != corpus_file:
+            old_ids = dict(dictionary.token2id)
+            dictionary.filter_extremes(no_below=no_below or 1, no_above=no_above or 1.0, keep_n=None)
+            remap = {old_ids[token]: new_id for token, new_id in dictionary.token2id.items()}
+            remapped = ([(remap[i], count) for i, count in bow if i in remap] for bow in corpora.MmCorpus(raw_file))
+            corpora.MmCorpus.serialize(corpus_file, remapped, id2word=dictionary)
+            for suffix in ('', '.index'):
+                if os.path.exists(raw_file + suffix):
+                    os.remove(raw_file + suffix)
+
+        dictionary.save(dictionary_file)
+        hashes.to_csv(hashes_file, sep='\t', index=False)
+
+    return corpora.MmCorpus(corpus_file), corpora.Dictionary.load(dictionary_file), hashes
+
+def save_model(lda, hashes, model_dir=MODEL_DIR, tokenizer=None):
+    """Model plus the text hash of every movie it has been trained on and how texts were tokenized"""
+    os.makedirs(model_dir, exist_ok=True)
+    lda.save(os.path.join(model_dir, 'lda.model'))
+    hashes.to_csv(os.path.join(model_dir, 'documents.tsv'), sep='\t', index=False)
+    with open(os.path.join(model_dir, 'tokenizer.json'), 'w') as file:
+        json.dump({'stem': bool(tokenizer and tokenizer.stem)}, file)
+
+def load_model(model_dir=MODEL_DIR):
+    """(lda, document hashes, tokenizer the model was trained with)"""
+    lda = LdaMulticore.load(os.path.join(model_dir, 'lda.model'))
+    hashes = pd.read_csv(os.path.join(model_dir, 'documents.tsv'), sep='\t')
+    with open(os.path.join(model_dir, 'tokenizer.json')) as file:
+        tokenizer = Tokenizer(**json.load(file))
+    return lda, hashes, tokenizer
+
+def train_model(path, model_dir=MODEL_DIR, num_topics=NUM_TOPICS, passes=10, workers=None, cache_dir=CACHE_DIR,
+                random_state=None, stem=False):
+    """Train from scratch on every movie of the TSV with one worker process per core"""
+    tokenizer = Tokenizer(stem=stem)
+    corpus, dictionary, hashes = build_corpus(path, cache_dir, tokenizer=tokenizer, workers=workers or os.cpu_count())
+    lda = LdaMulticore(corpus=corpus, num_topics=num_topics, id2word=dictionary, passes=passes,
+                       workers=workers, random_state=random_state)
+    save_model(lda, hashes, model_dir, tokenizer)
+    return lda
+
+def new_documents(path, hashes):
+    """(tconst, text) of movies that are not in `hashes` or whose text changed"""
+    known = dict(zip(hashes['tconst'], hashes['text_hash']))
+    for tconst, text in movie_texts(path):
+        if known.get(tconst) != text_hash(text):
+            yield tconst, text
+
+def update_model(path, model_dir=MODEL_DIR):
+    """Fold newly scraped or edited movies into a saved model instead of retraining.
+
+    The vocabulary stays the one the model was trained with; words it has never
+    seen are ignored. Returns the number of documents added.
+    """
+    lda, hashes, tokenizer = load_model(model_dir)
+    documents = list(new_documents(path, hashes))
+    if not documents:
+        return 0
+
+    corpus = [lda.id2word.doc2bow(tokenizer(text)) for _, text in documents]
+    lda.update(corpus)
+
+    updated = pd.DataFrame([(tconst, text_hash(text)) for tconst, text in documents], columns=['tconst', 'text_hash'])
+    hashes = pd.concat([hashes[~hashes['tconst'].isin(updated['tconst'])], updated], ignore_index=True)
+    save_model(lda, hashes, model_dir, tokenizer)
+    return len(documents)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or update the LDA topic model on the movie texts")
+    parser.add_argument('movies', nargs='?', default='../Common/rly_final_movies.tsv')
+    parser.add_argument('--update', action='store_true', help="Add new and changed movies to the saved model")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--topics', type=int, default=NUM_TOPICS)
+    parser.add_argument('--passes', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--stem', action='store_true', help="Porter-stem words before training")
+    args = parser.parse_args()
+
+    if args.update:
+        print(f"Updated the model with {update_model(args.movies, args.model_dir)} documents")
+    else:
+        train_model(args.movies, args.model_dir, args.topics, args.passes, args.workers, stem=args.stem)
+        print(f"Model saved to {args.model_dir}")
+
+if __name__ == "__main__":
+    main()